@@ -1,44 +1,26 @@
 import sys
 import os
+import functools
+from types import MappingProxyType
 
 # Add the project root to sys.path to enable imports from components/
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
+# scripts/ contient le module de sessions Lumerical partagées
+scripts_dir = os.path.join(project_root, "scripts")
+if scripts_dir not in sys.path:
+    sys.path.insert(0, scripts_dir)
 
-# Define the paths to the Lumerical installation
-lumerical_api_path = r"C:\Program Files\Lumerical\v252\api\python"
-lumerical_python_path = r"C:\Program Files\Lumerical\v252\python"
-lumerical_site_packages_path = r"C:\Program Files\Lumerical\v252\python\Lib\site-packages"
-
-# Add the paths to sys.path if they are not already there
-if lumerical_api_path not in sys.path:
-    sys.path.append(lumerical_api_path)
-if lumerical_python_path not in sys.path:
-    sys.path.append(lumerical_python_path)
-if lumerical_site_packages_path not in sys.path:
-    sys.path.append(lumerical_site_packages_path)
+# Chemins de l'installation Lumerical (API + Python embarqué pour gplugins),
+# ajoutés une seule fois
+from lumerical_session import ensure_lumerical_path
+ensure_lumerical_path(with_python=True)
 
 import numpy as np
 import gdsfactory as gf
 
-# APPLY MONKEY-PATCH FIRST, BEFORE IMPORTING LUMERICAL
-# Monkey-patch Port class to ensure orientations are in [0, 360) for Lumerical compatibility
-_original_port_orientation_getter = gf.Port.orientation.fget
-
-def _normalized_orientation_getter(self):
-    """Get normalized orientation in [0, 360) range for Lumerical."""
-    orig_angle = _original_port_orientation_getter(self)
-    # Ensure angle is in [0, 360) range
-    return orig_angle % 360
-
-# Apply the patch BEFORE importing Lumerical
-gf.Port.orientation = property(_normalized_orientation_getter)
-
-# Now import Lumerical and other modules
-import gplugins.lumerical as sim
 from components.star_coupler import star_coupler
-import lumapi
 import gdsfactory.components.containers.extension as gf_extension
 
 # Patch extend_ports to disable kfactory grid-instance checks for rotated tapers
@@ -49,39 +31,41 @@ gf_extension.extend_ports = gf.cell(check_instances=False)(
     gf_extension.extend_ports.__wrapped__
 )
 
-# CRITICAL: Patch the angle validation logic in write_sparameters_lumerical
-# The problem is angles like 353.374 don't match any valid range
-# We need to normalize them before Lumerical sees them
-import inspect
-import types
-
-# Get the original write_sparameters_lumerical function
-_original_write_sparameters = sim.write_sparameters_lumerical
-
-def _create_patched_write_sparameters(original_func):
-    """Create a wrapper that normalizes port angles before validation."""
-    def write_sparameters_lumerical_patched(component, **kwargs):
-        """
-        Wrapper that works with port angles already normalized to [0, 360).
-        """
-        # Just pass through to original function - no special handling needed
-        return original_func(component, **kwargs)
-    
-    return write_sparameters_lumerical_patched
+# On mappe les noms de matériaux du PDK aux noms dans la base de données Lumerical
+MATERIAL_NAME_TO_LUMERICAL = MappingProxyType({
+    "si": "Si (Silicon) - Palik",
+    "sio2": "SiO2 (Glass) - Palik",
+})
+
+
+@functools.lru_cache(maxsize=1)
+def get_layer_stack():
+    """Return the ubcpdk layer stack, activating the PDK only if it is not already active."""
+    import ubcpdk
+    try:
+        active_name = gf.get_active_pdk().name
+    except Exception:
+        active_name = None
+    # Réactiver le PDK ré-enregistre toutes ses cellules: à éviter (notebooks)
+    if active_name != ubcpdk.PDK.name:
+        ubcpdk.PDK.activate()
+    return gf.get_active_pdk().layer_stack
 
-# Replace the function
-sim.write_sparameters_lumerical = _create_patched_write_sparameters(_original_write_sparameters)
+
+# Simplified orientation per port-name prefix (digits stripped): outputs
+# point outward at 0°, inputs inward at 180°. Unknown prefixes default to 0°.
+LUMERICAL_PORT_ORIENTATION = {'e': 0, 'out': 0, 'o': 180, 'i': 180}
 
 def fix_port_orientations_for_lumerical(component):
     """
     Create a component with simplified port orientations for Lumerical.
     
     Since the tapers have very small angles, we approximate:
-    - Output ports (e*): 0° (pointing right/outward)
-    - Input ports (o*): 180° (pointing left/inward)
+    - Output ports (e*, out*): 0° (pointing right/outward)
+    - Input ports (o*, i*): 180° (pointing left/inward)
     
     This eliminates the orientation validation problem while maintaining
-    the correct propagation direction.
+    the correct propagation direction, without patching gf.Port globally.
     """
     # Create a new component that references the original
     c = gf.Component(f"{component.name}_lum")
@@ -89,46 +73,26 @@ def fix_port_orientations_for_lumerical(component):
     # Instance the original component  
     ref = c << component
     
-    # Collect port information with simplified orientations
-    ports_data = []
+    # Add all ports with corrected orientations in a single pass
     for port in component.ports:
-        # Determine orientation based on port name
-        # Output ports (e1, e2, e3, e4) point outward at 0°
-        # Input ports (o1, o2, o3) point inward at 180°
-        if port.name.startswith('e'):
-            orientation = 0  # Output ports point right
-        elif port.name.startswith('o'):
-            orientation = 180  # Input ports point left
-        else:
-            orientation = 0  # Default
-        
-        ports_data.append({
-            'name': port.name,
-            'center': tuple(port.center),
-            'width': port.width,
-            'orientation': orientation,
-            'layer': port.layer,
-            'port_type': port.port_type
-        })
-    
-    # Add all ports with corrected orientations
-    for port_info in ports_data:
-        c.add_port(**port_info)
+        c.add_port(
+            name=port.name,
+            center=tuple(port.center),
+            width=port.width,
+            orientation=LUMERICAL_PORT_ORIENTATION.get(port.name.rstrip('0123456789'), 0),
+            layer=port.layer,
+            port_type=port.port_type,
+        )
     
     return c
 
 print("--- Simulation Lumerical FDTD pour Star Coupler ---")
 # 1. Activation du PDK et chargement du composant
-import ubcpdk
-ubcpdk.PDK.activate()
-
-# Clear component cache to ensure updated port orientations are used
-gf.clear_cache()
+get_layer_stack()  # Active le PDK (une seule fois, résultat mis en cache)
 
 c_original = star_coupler(n_inputs=3, n_outputs=4)
 print("Original component:", c_original)
 
-# Verify port orientations after monkey-patch
 print("Port orientations before fix:")
 for port in c_original.ports:
     print(f"  {port.name}: {port.orientation:.3f}°")
@@ -143,35 +107,40 @@ for port in c.ports:
 print("Component is ready for simulator.")
 #c.show()
 
-# 2. Récupération du LayerStack corrigé
-layer_stack = gf.get_active_pdk().layer_stack
+# 2. Récupération du LayerStack corrigé (calculé une seule fois)
+layer_stack = get_layer_stack()
 
-# 3. Configuration des matériaux pour Lumerical
-# On mappe les noms de matériaux du PDK aux noms dans la base de données Lumerical
-material_name_to_lumerical = {
-    "si": "Si (Silicon) - Palik",
-    "sio2": "SiO2 (Glass) - Palik",
-}
+# 3. Configuration des matériaux pour Lumerical: voir MATERIAL_NAME_TO_LUMERICAL
 # 4. Lancement de la simulation
 print("Ouverture de Lumerical...")
 
-# On crée l'objet session pour garder la main dessus
-fdtd = lumapi.FDTD(hide=False)
+# Import différé: gplugins.lumerical n'est chargé qu'une fois le composant
+# prêt, juste avant d'ouvrir la session
+import gplugins.lumerical as sim
+from lumerical_session import get_fdtd
+
+# Session FDTD partagée (réutilisée si déjà ouverte dans ce processus)
+fdtd = get_fdtd()  # LUM_GUI=1 pour afficher l'interface
 
 # Récupération du dossier courant pour la sauvegarde
-import os
 current_dir = os.getcwd()
 
 try:
     print("Construction de la simulation dans Lumerical...")
     
+    # Session réutilisée: repartir d'une scène vide plutôt que d'ouvrir un nouveau FDTD
+    fdtd.switchtolayout()
+    fdtd.deleteall()
+
     # ON RETIRE 'filepath' qui causait l'erreur
     # La fonction va utiliser le nom du composant pour les fichiers temporaires
+    # Le composant est transmis hiérarchique (pas de flatten): star_coupler est
+    # déjà composé de polygones, seule la cellule d'enveloppe _lum ajoute une référence
     sim.write_sparameters_lumerical(
         component=c,
         session=fdtd,
         layer_stack=layer_stack,
-        material_name_to_lumerical=material_name_to_lumerical,
+        material_name_to_lumerical=MATERIAL_NAME_TO_LUMERICAL,
         wavelength_start=1.55,
         wavelength_stop=1.55,
         wavelength_points=1,
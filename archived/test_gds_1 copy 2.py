@@ -1,5 +1,5 @@
 from __future__ import annotations
-from functools import partial
+from functools import lru_cache, partial
 import numpy as np
 import gdsfactory as gf
 from gdsfactory.component import Component
@@ -7,6 +7,51 @@ from gdsfactory.typings import ComponentSpec, CrossSectionSpec
 
 
 
+def _fpr_outline(radius: float, theta1: float, theta2: float, step: float = 0.01) -> np.ndarray:
+    """Contour (M, 2) de la région de propagation libre (deux arcs et leurs miroirs)."""
+    num_points1 = int(theta1/ step) + 1
+    num_points2 = int(theta2/ step) + 1
+    # Un seul tableau d'angles (arc de sortie puis arc d'entrée): cos/sin calculés une fois
+    # Grilles construites directement en radians (pas de passage par les degrés)
+    half1 = np.deg2rad(0.5*theta1)
+    half2 = np.deg2rad(0.5*theta2)
+    angles_rad = np.concatenate([
+        np.linspace(-half1, half1, num_points1),
+        np.linspace(np.pi - half2, np.pi + half2, num_points2),
+    ])
+    x = radius*np.cos(angles_rad)
+    y = radius*np.sin(angles_rad)
+    x1, y1 = x[:num_points1], y[:num_points1]
+    x2, y2 = x[num_points1:] + radius, y[num_points1:]
+
+    # Contour: arc 1, arc 2, arc 2 miroir, arc 1 miroir (remplissage par tranches)
+    n = num_points1 + num_points2
+    pts = np.empty((2*n, 2))
+    pts[:num_points1, 0], pts[:num_points1, 1] = x1, y1
+    pts[num_points1:n, 0], pts[num_points1:n, 1] = x2, y2
+    # Miroirs écrits directement dans pts via des vues inversées (pas de temporaire)
+    pts[n:n+num_points2, 0] = x2[::-1]
+    np.negative(y2[::-1], out=pts[n:n+num_points2, 1])
+    pts[n+num_points2:, 0] = x1[::-1]
+    np.negative(y1[::-1], out=pts[n+num_points2:, 1])
+    return pts
+
+
+@lru_cache(maxsize=32)
+def _xs(width: float, layer: tuple, radius: float | None = None):
+    """Section transversale partagée par (largeur, couche, rayon): clé de cache stable."""
+    kwargs = {"width": width, "layer": layer}
+    if radius is not None:
+        kwargs["radius"] = radius
+    return gf.cross_section.cross_section(**kwargs)
+
+
+def _snap_points(points: np.ndarray) -> np.ndarray:
+    """Arrondit un tableau de coordonnées (µm) sur la grille de la base de données."""
+    grid = gf.kcl.dbu
+    return np.round(points / grid) * grid
+
+
 @gf.cell
 def free_propagation_region(
     radius: float = 117,
@@ -17,31 +62,14 @@ def free_propagation_region(
     wg_width: float = 0.5,
     inputs: int = 3,
     outputs: int = 4,
-    layer: tuple = (1,0)
+    layer: tuple = (1,0),
+    angle_step: float = 0.01,
 ) -> gf.Component:
     c = gf.Component()
 
-    num_points1 = int(theta1/ 0.01) + 1
-    angles1 = np.linspace(-0.5*theta1, 0.5*theta1, num_points1)
-    angles_rad1 = np.deg2rad(angles1)
-    x1 = radius*np.cos(angles_rad1)
-    y1 = radius*np.sin(angles_rad1)
-
-    num_points2 = int(theta2/ 0.01) + 1
-    angles2 = np.linspace(180-0.5*theta2, 180+0.5*theta2, num_points2)
-    angles_rad2 = np.deg2rad(angles2)
-
-    x2 = radius*np.cos(angles_rad2)+radius
-    y2 = radius*np.sin(angles_rad2)
-
-
-
-    xpts = np.concatenate([x1, x2, x2[::-1], x1[::-1]])
-    ypts = np.concatenate([y1, y2, -y2[::-1], -y1[::-1]])
-
-
-    c = gf.Component()
-    c.add_polygon(list(zip(xpts, ypts)), layer=(1, 0))
+    # angle_step (degrés): résolution des arcs du contour
+    pts = _fpr_outline(radius, theta1, theta2, step=angle_step)
+    c.add_polygon(pts, layer=(1, 0))
 
 
     if inputs == 1:
@@ -54,31 +82,34 @@ def free_propagation_region(
         )
 
     else:
+        # Tous les angles d'un coup, centres arrondis sur la grille en une opération
+        thetas_in = np.pi - 0.5*(inputs-1)*da/radius + np.arange(inputs)*da/radius
+        centers_in = _snap_points(np.column_stack([
+            (radius - 0.002) * np.cos(thetas_in) + radius,
+            (radius - 0.002) * np.sin(thetas_in),
+        ]))
+        orients_in = np.degrees(thetas_in)
         for i in range(inputs):
-            theta = np.pi-0.5*(inputs-1)*da/radius + i*da/radius
-            x = (radius - 0.002) * np.cos(theta) + radius
-            y = (radius - 0.002) * np.sin(theta)
-            x = gf.snap.snap_to_grid(x)
-            y = gf.snap.snap_to_grid(y)
             c.add_port(
                 f"W{i}",
-                center=(x, y),
+                center=tuple(centers_in[i]),
                 width=wg_width,
-                orientation=theta/np.pi*180,
+                orientation=float(orients_in[i]),
                 layer=layer,
             )
 
+    thetas_out = -0.5*(outputs-1)*dg/radius + np.arange(outputs)*dg/radius
+    centers_out = _snap_points(np.column_stack([
+        (radius - 0.002) * np.cos(thetas_out),
+        (radius - 0.002) * np.sin(thetas_out),
+    ]))
+    orients_out = np.degrees(thetas_out)
     for i in range(outputs):
-        theta = -0.5*(outputs-1)*dg/radius + i*dg/radius
-        x = (radius - 0.002) * np.cos(theta)
-        y = (radius - 0.002) * np.sin(theta)
-        x = gf.snap.snap_to_grid(x)
-        y = gf.snap.snap_to_grid(y)
         c.add_port(
             f"E{i}",
-            center=(x, y),
+            center=tuple(centers_out[i]),
             width=wg_width,
-            orientation=theta/np.pi*180,
+            orientation=float(orients_out[i]),
             layer=layer,
         )
     return c
@@ -128,13 +159,15 @@ def star_coupler(
     fpr_ref = c.add_ref(fpr)
 
     # Créer la section transversale pour les guides d'onde
-    xs = gf.cross_section.cross_section(width=wg_width, layer=layer)
+    xs = _xs(wg_width, layer)
+
+    # Un seul guide droit par longueur, référencé pour chaque port
+    wg_in = gf.components.straight(length=input_wg_length, cross_section=xs)
+    wg_out = gf.components.straight(length=output_wg_length, cross_section=xs)
     
     # Ajouter les guides d'onde d'entrée (côté gauche)
     for i in range(inputs):
-        # Créer un guide d'onde droit
-        wg = gf.components.straight(length=input_wg_length, cross_section=xs)
-        wg_ref = c.add_ref(wg)
+        wg_ref = c.add_ref(wg_in)
         
         # Connecter le guide d'onde au port d'entrée du FPR
         wg_ref.connect("o2", fpr_ref.ports[f"W{i}"])
@@ -144,9 +177,7 @@ def star_coupler(
     
     # Ajouter les guides d'onde de sortie (côté droit)
     for i in range(outputs):
-        # Créer un guide d'onde droit
-        wg = gf.components.straight(length=output_wg_length, cross_section=xs)
-        wg_ref = c.add_ref(wg)
+        wg_ref = c.add_ref(wg_out)
         
         # Connecter le guide d'onde au port de sortie du FPR
         wg_ref.connect("o1", fpr_ref.ports[f"E{i}"])
@@ -201,35 +232,29 @@ def star_coupler_with_gc(
     # Créer les grating couplers alignés en rangée verticale
     gc_component = gf.components.grating_coupler_elliptical_te()
     
-    # Positionner les grating couplers en rangée verticale
-    gc_refs = []
-    for i in range(num_gc):
-        gc_ref = c.add_ref(gc_component)
-        # Positionner les GC en rangée verticale, espacés de gc_spacing
-        gc_ref.x = 0
-        gc_ref.y = i * gc_spacing
-        # Orienter les GC horizontalement (pas de rotation)
-        # gc_ref.rotate(0)  # Pas besoin de rotation, ils sont déjà horizontaux
-        gc_refs.append(gc_ref)
-
-    # Router chaque connexion individuellement
-    xs = gf.cross_section.cross_section(width=wg_width, layer=layer, radius=10)
+    # Positionner les grating couplers en rangée verticale: une seule référence
+    # en tableau (AREF) de num_gc lignes espacées de gc_spacing
+    gc_array = c.add_ref(gc_component, columns=1, rows=num_gc, row_pitch=gc_spacing)
+    # Centre du premier GC en (0, 0), comme les références individuelles précédentes
+    gc_array.move((-gc_component.x, -gc_component.y))
+
+    # Router toutes les connexions en un seul faisceau
+    xs = _xs(wg_width, layer, radius=10)
     
     # Connecter seulement les GC #2, #3, #4 (indices 1, 2, 3) aux entrées du star coupler
     # GC #1 (indice 0) et GC #5 (indice 4) ne sont pas connectés
     gc_to_connect = [1, 2, 3]  # Indices des GC à connecter
-    for idx, gc_idx in enumerate(gc_to_connect):
-        if gc_idx < num_gc and idx < inputs:
-            gc_port = gc_refs[gc_idx].ports["o1"]
-            sc_port = sc_ref.ports[f"input_{idx}"]
-            
-            # Utiliser route_single pour router chaque connexion individuellement
-            route = gf.routing.route_single(
-                c,
-                gc_port,
-                sc_port,
-                cross_section=xs,
-            )
+    pairs = [
+        (gc_idx, idx) for idx, gc_idx in enumerate(gc_to_connect)
+        if gc_idx < num_gc and idx < inputs
+    ]
+    if pairs:
+        gf.routing.route_bundle(
+            c,
+            [gc_array.ports["o1", 0, gc_idx] for gc_idx, _ in pairs],
+            [sc_ref.ports[f"input_{idx}"] for _, idx in pairs],
+            cross_section=xs,
+        )
 
     # Exposer les ports de sortie du star coupler
     for i in range(outputs):
@@ -6,20 +6,59 @@ export to output/gds.
 
 from __future__ import annotations
 from pathlib import Path
+import argparse
+import functools
+import itertools
+import logging
+from types import MappingProxyType
 import warnings
 import uuid
 import gdsfactory as gf
-import ubcpdk
+import kfactory as kf
+import numpy as np
 import os
 
 from star_coupler import star_coupler
 from ANT_PDK_component import my_mmi_3db
 from ANT_PDK_component import ANT_GC
 
+logger = logging.getLogger(__name__)
+
+# Unique suffix for SC circuit cell names (origins truncated to int could collide)
+_circuit_counter = itertools.count()
+
+# Unique suffix for cached template builds (a cache miss rebuilds in the same layout)
+_build_counter = itertools.count()
+
 # Suppress gdsfactory warnings about width being ignored when a cross_section is provided
 warnings.filterwarnings("ignore", message=".*ignored for cross_section.*")
 
 
+@functools.lru_cache(maxsize=None)
+def _port_cross_section(layer, width: float, radius: float | None = None) -> gf.CrossSection:
+	"""Return a shared cross-section matching a port's layer and width."""
+	if radius is None:
+		return gf.cross_section.cross_section(layer=layer, width=width)
+	return gf.cross_section.cross_section(layer=layer, width=width, radius=radius)
+
+
+@functools.lru_cache(maxsize=256)
+def _port_straight(length: float, layer, width: float) -> gf.Component:
+	"""Return a shared straight matching a port's layer and width."""
+	return gf.components.straight(length=length, cross_section=_port_cross_section(layer, width))
+
+
+@functools.lru_cache(maxsize=256)
+def _port_taper(length: float, width1: float, width2: float, layer) -> gf.Component:
+	"""Return a shared width-adapting taper."""
+	return gf.components.taper(
+		length=length,
+		width1=width1,
+		width2=width2,
+		layer=layer,
+	)
+
+
 def normalize_port_width(
 	circuit: gf.Component,
 	port: gf.Port,
@@ -27,15 +66,10 @@ def normalize_port_width(
 	length: float = 10.0,
 ) -> gf.Port:
 	"""Insert a taper if needed so the returned port has target_width."""
-	if abs(port.width - target_width) < 1e-6:
+	# Widths closer than half a database unit are identical once written
+	if abs(port.width - target_width) < 0.5 * circuit.kcl.dbu:
 		return port
-	taper = gf.components.taper(
-		length=length,
-		width1=port.width,
-		width2=target_width,
-		layer=port.layer,
-	)
-	ref = circuit << taper
+	ref = circuit << _port_taper(length, port.width, target_width, port.layer)
 	ref.connect("o1", port)
 	return ref.ports["o2"]
 
@@ -49,9 +83,7 @@ def flip_port_orientation(
 	"""Returns a new port with target orientation by inserting a short straight."""
 	if port.orientation == target_orientation:
 		return port
-	cs_port = gf.cross_section.cross_section(layer=port.layer, width=port.width)
-	straight = gf.components.straight(length=length, cross_section=cs_port)
-	ref = circuit << straight
+	ref = circuit << _port_straight(length, port.layer, port.width)
 	if target_orientation == 0:
 		ref.connect("o2", port)
 		return ref.ports["o1"]
@@ -67,9 +99,7 @@ def extend_port(
 	length: float = 25.0,
 ) -> gf.Port:
 	"""Extend a port in its facing direction by a straight of given length."""
-	cs_port = gf.cross_section.cross_section(layer=port.layer, width=port.width)
-	straight = gf.components.straight(length=length, cross_section=cs_port)
-	ref = circuit << straight
+	ref = circuit << _port_straight(length, port.layer, port.width)
 	ref.connect("o1", port)
 	return ref.ports["o2"]
 
@@ -100,6 +130,21 @@ def add_sem_rectangle(
 	ref.move(position)
 
 
+@functools.lru_cache(maxsize=512)
+def _text_cell(text: str, size: float, layer: tuple[int, int], rectangular: bool) -> gf.Component:
+	"""Return a shared text cell, so repeated labels (IN1, OUT1, ...) are built once."""
+	if rectangular:
+		pixel_size = size / 5.0
+		# Ensure pixel size is not too small (must be > min feature size, e.g. 0.12um)
+		pixel_size = max(pixel_size, 0.15)
+		return gf.components.text_rectangular(
+			text=text,
+			size=pixel_size,
+			layer=layer,
+		)
+	return gf.components.text(text=text, size=size, layer=layer)
+
+
 def add_port_label(
 	circuit: gf.Component,
 	text: str,
@@ -123,18 +168,7 @@ def add_port_label(
 		orientation: GC waveguide orientation ("North", "South", "East", "West").
 	"""
 
-	if rectangular:
-		pixel_size = size / 5.0
-    	# Ensure pixel size is not too small (must be > min feature size, e.g. 0.12um)
-		pixel_size = max(pixel_size, 0.15)	
-		label = gf.components.text_rectangular(
-		text=text, 
-		size=pixel_size, 
-		layer=layer
-		)	
-	else:
-		label = gf.components.text(text=text, size=size, layer=layer)
-	label_ref = circuit << label
+	label_ref = circuit << _text_cell(text, size, tuple(layer), rectangular)
 	
 	# Estimate text bounding box width
 	# Typical character width is ~60-70% of font size
@@ -165,15 +199,24 @@ def add_port_label(
 		shift_x = 0
 		shift_y = -text_width + size * 0.5
 	else:
-		print("[WARNING] Unknown orientation for label: {}. No rotation or shift applied.".format(orientation))
+		logger.warning("Unknown orientation for label: %s. No rotation or shift applied.", orientation)
 		shift_x = 0
 		shift_y = 0
 	
 	label_ref.move((position[0] + shift_x, position[1] + shift_y))
 
 
+def _sin_cross_section(width: float = 0.75, radius: float | None = None) -> gf.CrossSection:
+	"""Return a shared SiN cross-section (one object per width/radius)."""
+	return _port_cross_section(SIN_LAYER, width, radius)
+
+
+@functools.lru_cache(maxsize=None)
 def _get_sin_grating_coupler() -> gf.Component:
-	"""Return a non-black-box SiN grating coupler for 1.55 um."""
+	"""Return a non-black-box SiN grating coupler for 1.55 um.
+
+	Cached so every GC array on the chip references the same cell.
+	"""
 
 	# ANT GC included in PDK
 	try:
@@ -181,7 +224,7 @@ def _get_sin_grating_coupler() -> gf.Component:
 
 	except:
 	# GDS factory included Grating Coupler:
-		cs_sin = gf.cross_section.cross_section(layer=SIN_LAYER, width=0.75)
+		cs_sin = _sin_cross_section(0.75)
 		GC = gf.components.grating_coupler_elliptical(
 			wavelength=1.55,
 			layer_slab=None,
@@ -190,92 +233,147 @@ def _get_sin_grating_coupler() -> gf.Component:
 	return GC
 
 
-def _add_grating_coupler_array(
+@functools.lru_cache(maxsize=None)
+def _bend_euler(angle: float, radius: float, cross_section: gf.CrossSection) -> gf.Component:
+	"""Return a shared Euler bend cell for (angle, radius, cross-section)."""
+	return gf.components.bend_euler(angle=angle, cross_section=cross_section, radius=radius)
+
+
+@functools.lru_cache(maxsize=None)
+def _euler_path(angle: float, radius: float) -> gf.Path:
+	"""Return a shared Euler bend path (same parameters as bend_euler).
+
+	Path.append copies the points it receives, so the cached path is never
+	modified by the callers.
+	"""
+	return gf.path.euler(radius=radius, angle=angle, p=0.5, use_eff=True)
+
+
+@functools.lru_cache(maxsize=256)
+def _extruded_path(points: tuple[tuple[float, float], ...], cross_section: gf.CrossSection) -> gf.Component:
+	"""Return a shared extruded cell for a path given by its points.
+
+	gf.path.extrude creates a new cell on every call; identical geometry
+	(same points and cross-section) is extruded only once.
+	"""
+	return gf.path.extrude(gf.Path(np.array(points)), cross_section=cross_section)
+
+
+def _path_key(path: gf.Path) -> tuple[tuple[float, float], ...]:
+	"""Hashable point list of a path, rounded to 1e-6 um to absorb float noise."""
+	return tuple(map(tuple, np.round(path.points, 6).tolist()))
+
+
+@functools.lru_cache(maxsize=None)
+def _gc_port_name() -> str:
+	"""Name of the grating coupler's optical port, resolved once from the cached cell."""
+	return next(iter(_get_sin_grating_coupler().ports)).name
+
+
+def _gc_port(gc_ref: gf.ComponentReference) -> gf.Port:
+	"""Optical port of a grating coupler reference (direct lookup by name)."""
+	return gc_ref.ports[_gc_port_name()]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_mmi_3db() -> gf.Component:
+	"""Return the shared ANT 3 dB MMI cell (imported from ANT_PDK.gds once)."""
+	return my_mmi_3db()
+
+
+# GC array orientation -> (rotation angle, unit step x, unit step y); steps are scaled by pitch
+_GC_ARRAY_ORIENTATION = MappingProxyType({
+	"East": (0, 0.0, -1.0),
+	"West": (180, 0.0, -1.0),
+	"North": (90, 1.0, 0.0),
+	"South": (270, 1.0, 0.0),
+})
+
+
+def add_grating_coupler_array(
 	circuit: gf.Component,
-	origin: tuple[float, float],
-	num_couplers: int,
-	pitch: float,
-	orientation: str,
-	label_prefix: str | None,
-	label_size: float,
+	origin: tuple[float, float] = (0, 0),
+	num_couplers: int = 8,
+	pitch: float = 127.0,
+	orientation: str = "East",
+	label_prefix: str | None = "IN",
+	label_size: float = 8.0,
 	label_order: str = "placement",
 ) -> list:
-	"""Add a grating coupler array to circuit."""
+	"""Add a grating coupler array to circuit.
+
+	All arrays reference the same cached GC cell.
+
+	Args:
+		circuit: The circuit component to add couplers to.
+		origin: Relative origin position (x, y).
+		num_couplers: Number of grating couplers.
+		pitch: Spacing between couplers (um).
+		orientation: Waveguide direction ("North", "South", "East", "West").
+		label_prefix: Label text prefix, or None for no labels.
+		label_size: Label text size (um).
+		label_order: "placement", "top_to_bottom" or "bottom_to_top".
+
+	Returns:
+		List of grating coupler instance references.
+	"""
+	if num_couplers <= 0:
+		return []
 	gc = _get_sin_grating_coupler()
-	orientation_map = {
-		"East": {"angle": 0, "dx": 0, "dy": -pitch},
-		"West": {"angle": 180, "dx": 0, "dy": -pitch},
-		"North": {"angle": 90, "dx": pitch, "dy": 0},
-		"South": {"angle": 270, "dx": pitch, "dy": 0},
-	}
-	config = orientation_map[orientation]
+	angle, ux, uy = _GC_ARRAY_ORIENTATION[orientation]
 	gc_refs = []
 
-	for i in range(num_couplers):
+	# All placement coordinates at once: origin + i * pitch * (ux, uy)
+	delta = pitch * np.array([ux, uy])
+	positions = np.asarray(origin, dtype=float) + np.arange(num_couplers)[:, None] * delta
+
+	for x_pos, y_pos in positions.tolist():
 		gc_ref = circuit << gc
-		x_pos = origin[0] + i * config["dx"]
-		y_pos = origin[1] + i * config["dy"]
-		# Rotate first so the placement order stays consistent for all orientations
-		gc_ref.rotate(config["angle"] -180)  
-		gc_ref.move((x_pos, y_pos))
+		# One transform per instance: rotate about the origin, then translate
+		# (same result as rotate() followed by move(), in a single KLayout call)
+		gc_ref.dcplx_trans = gf.kdb.DCplxTrans(1.0, angle - 180, False, x_pos, y_pos)
 		gc_refs.append(gc_ref)
 
 	if label_prefix and gc_refs:
 		if label_order == "placement":
 			label_refs = gc_refs
 		elif label_order in {"top_to_bottom", "bottom_to_top"}:
-			label_refs = sorted(
-				gc_refs,
-				key=lambda r: r.center[1],
-				reverse=(label_order == "top_to_bottom"),
-			)
+			# All GCs share one rotation, so their centers sort like the
+			# placement positions; stable sort keeps ties in placement order
+			y = positions[:, 1]
+			order = np.argsort(-y if label_order == "top_to_bottom" else y, kind="stable")
+			label_refs = [gc_refs[i] for i in order.tolist()]
 		else:
 			raise ValueError(
 				"label_order must be 'placement', 'top_to_bottom', or 'bottom_to_top'"
 			)
-		for index, gc_ref in enumerate(label_refs, start=1):
-
+		label_texts = [f"{label_prefix}{index}" for index in range(1, len(label_refs) + 1)]
+		for text, gc_ref in zip(label_texts, label_refs):
+			cx, cy = gc_ref.center
 			add_port_label(
 				circuit,
-				text=f"{label_prefix}{index}",
-				position=(gc_ref.center[0], gc_ref.center[1]),
+				text=text,
+				position=(cx, cy),
 				size=label_size,
 				orientation=orientation
 			)
 
 	return gc_refs
 
-def add_input_grating_coupler_array(
-	circuit: gf.Component,
-	origin: tuple[float, float] = (0, 0),
-	num_couplers: int = 8,
-	pitch: float = 127.0,
-	orientation: str = "East",
-	label_prefix: str | None = "IN",
-	label_size: float = 8.0,
-) -> list:
-	"""Add input grating coupler array to circuit.
-	
-	Args:
-		circuit: The circuit component to add couplers to.
-		origin: Relative origin position (x, y).
-		num_couplers: Number of grating couplers.
-		pitch: Spacing between couplers (um).
-		orientation: Output direction ("North", "South", "East", "West").
-	
-	Returns:
-		List of grating coupler instance references.
-	"""
-	return _add_grating_coupler_array(
-		circuit=circuit,
-		origin=origin,
-		num_couplers=num_couplers,
-		pitch=pitch,
-		orientation=orientation,
-		label_prefix=label_prefix,
-		label_size=label_size,
-		label_order="placement",
-	)
+
+# Input/output variants only differ by their defaults
+add_input_grating_coupler_array = functools.partial(
+	add_grating_coupler_array,
+	orientation="East",
+	label_prefix="IN",
+	label_order="placement",
+)
+add_output_grating_coupler_array = functools.partial(
+	add_grating_coupler_array,
+	orientation="West",
+	label_prefix="OUT",
+	label_order="top_to_bottom",
+)
 
 
 def add_star_coupler(
@@ -301,56 +399,19 @@ def add_star_coupler(
 	star_ref = circuit << star
 	star_ref.move(origin)
 
-	input_ports = []
-	for i in range(n_inputs):
-		name = f"i{i + 1}"
-		if name in star_ref.ports:
-			input_ports.append(star_ref.ports[name])
-
-	output_ports = []
-	for i in range(n_outputs):
-		name = f"out{i + 1}"
-		if name in star_ref.ports:
-			output_ports.append(star_ref.ports[name])
+	# Name -> port map built once; the indexed lookups below are then O(1)
+	ports_by_name = {port.name: port for port in star_ref.ports}
+	input_ports = [
+		ports_by_name[f"i{i + 1}"] for i in range(n_inputs) if f"i{i + 1}" in ports_by_name
+	]
+	output_ports = [
+		ports_by_name[f"out{i + 1}"] for i in range(n_outputs) if f"out{i + 1}" in ports_by_name
+	]
 
 	return {"ref": star_ref, "input_ports": input_ports, "output_ports": output_ports}
 
 
 
-def add_output_grating_coupler_array(
-	circuit: gf.Component,
-	origin: tuple[float, float] = (0, 0),
-	num_couplers: int = 8,
-	pitch: float = 127.0,
-	orientation: str = "West",
-	label_prefix: str | None = "OUT",
-	label_size: float = 8.0,
-	label_order: str = "top_to_bottom",
-) -> list:
-	"""Add output grating coupler array to circuit.
-	
-	Args:
-		circuit: The circuit component to add couplers to.
-		origin: Relative origin position (x, y).
-		num_couplers: Number of grating couplers.
-		pitch: Spacing between couplers (um).
-		orientation: Input direction ("North", "South", "East", "West").
-	
-	Returns:
-		List of grating coupler instance references.
-	"""
-	return _add_grating_coupler_array(
-		circuit=circuit,
-		origin=origin,
-		num_couplers=num_couplers,
-		pitch=pitch,
-		orientation=orientation,
-		label_prefix=label_prefix,
-		label_size=label_size,
-		label_order=label_order,
-	)
-
-
 def connect_gc_top_bottom_drawn(
 	circuit: gf.Component,
 	gc_refs: list,
@@ -370,17 +431,18 @@ def connect_gc_top_bottom_drawn(
 	- right bend (west) to the left backbone
 	- long vertical backbone behind the GC array
 	- bottom segment: taper, left bend, left bend, straight, right turn into backbone
+
+	Each side is a single extruded gf.Path rather than a chain of references.
 	"""
 	if len(gc_refs) < 2:
 		raise ValueError("Need at least 2 grating couplers")
 
 	top = gc_refs[0]
 	bottom = gc_refs[-1]
-	p_top = list(top.ports)[0]
-	p_bottom = list(bottom.ports)[0]
+	p_top = _gc_port(top)
+	p_bottom = _gc_port(bottom)
 
-	xs = [ref.center[0] for ref in gc_refs]
-	x_back = min(xs) - back_offset
+	x_back = min(ref.center[0] for ref in gc_refs) - back_offset
 
 	x_top = p_top.x
 	y_top = p_top.y
@@ -389,75 +451,57 @@ def connect_gc_top_bottom_drawn(
 	# Waypoints (absolute coordinates) defining the drawn path
 	y_mid = y_bottom + bottom_rise
 
-	# Build explicit SiN waveguide segments with Euler bends
-	cs = gf.cross_section.cross_section(layer=SIN_LAYER, width=0.75)
-	bend_r = gf.components.bend_euler(angle=-90, cross_section=cs, radius=30.0)
-	bend_l = gf.components.bend_euler(angle=90, cross_section=cs, radius=30.0)
-
-	def place_chain(start_port, elements):
-		current_port = start_port
-		for comp in elements:
-			ref = circuit << comp
-			ref.connect("o1", current_port)
-			current_port = ref.ports["o2"]
-		return current_port
-
-	def place_start_straight_at(port, length: float = 5.0):
-		"""Place a short SiN straight with its o1 aligned to a given port position."""
-		straight = gf.components.straight(length=length, cross_section=cs)
-		ref = circuit << straight
-		# rotate to match port orientation, then move so o1 aligns to port center
-		try:
-			ref.rotate(port.orientation, center=(0, 0))
-		except Exception:
-			pass
-		dx = port.center[0] - ref.ports["o1"].center[0]
-		dy = port.center[1] - ref.ports["o1"].center[1]
-		ref.move((dx, dy))
-		return ref.ports["o2"]
-
-	def place_start_taper_at(port, length: float = 20.0):
-		"""Place a short SiN taper with its o1 aligned to a given port position."""
-		taper = gf.components.taper(length=length, width1=0.75, width2=0.75, layer=SIN_LAYER)
-		ref = circuit << taper
-		try:
-			ref.rotate(port.orientation, center=(0, 0))
-		except Exception:
-			pass
-		dx = port.center[0] - ref.ports["o1"].center[0]
-		dy = port.center[1] - ref.ports["o1"].center[1]
-		ref.move((dx, dy))
-		return ref.ports["o2"]
+	# Each side is drawn as one gf.Path (straights + Euler bends) and
+	# extruded once. Paths are built in a local frame starting at the GC
+	# port and heading along its orientation.
+	cs = _sin_cross_section(0.75)
+
+	def end_point(port, path):
+		"""Chip coordinates of the end of a path drawn from port."""
+		x, y = path.points[-1]
+		angle = np.deg2rad(port.orientation)
+		return (
+			port.x + x * np.cos(angle) - y * np.sin(angle),
+			port.y + x * np.sin(angle) + y * np.cos(angle),
+		)
 
-	# Top segment into the backbone
-	cur = place_start_taper_at(p_top, length=20)
-	cur = place_chain(cur, [gf.components.straight(length=front_dx, cross_section=cs)])
-	cur = place_chain(cur, [bend_r])
-	cur = place_chain(cur, [gf.components.straight(length=first_drop, cross_section=cs)])
-	cur = place_chain(cur, [bend_r])
-	straight_len = abs(cur.x - x_back)
-	cur = place_chain(cur, [gf.components.straight(length=straight_len, cross_section=cs)])
-	cur = place_chain(cur, [bend_l])
+	def add_straight(path, length):
+		# Sub-nm straights would leave (near-)duplicate points in the path
+		if length > 1e-3:
+			path.append(gf.path.straight(length=length))
+
+	def extrude_at(port, path):
+		ref = circuit << _extruded_path(_path_key(path), cs)
+		ref.dcplx_trans = gf.kdb.DCplxTrans(1.0, port.orientation, False, port.x, port.y)
+		return ref
+
+	# Top segment into the backbone (20 um lead-in, then front_dx)
+	top_path = gf.path.straight(length=20 + front_dx)
+	top_path.append(_euler_path(-90, 30.0))
+	add_straight(top_path, first_drop)
+	top_path.append(_euler_path(-90, 30.0))
+	straight_len = abs(end_point(p_top, top_path)[0] - x_back)
+	add_straight(top_path, straight_len)
+	top_path.append(_euler_path(90, 30.0))
 
 	# Backbone vertical straight from top to bottom anchor
-	backbone_len = abs(cur.y - y_mid)/4
-	backbone = circuit << gf.components.straight(length=max(1, backbone_len), cross_section=cs)
-	backbone.rotate(90)
-	backbone.connect("o1", cur)
-	backbone_bottom = backbone.ports["o2"]
+	backbone_len = abs(end_point(p_top, top_path)[1] - y_mid)/4
+	add_straight(top_path, backbone_len)
+	extrude_at(p_top, top_path)
+	backbone_bottom_y = end_point(p_top, top_path)[1]
 
 	# Bottom segment into the backbone
-	cur_b = place_start_taper_at(p_bottom, length=20)
-	cur_b = place_chain(cur_b, [bend_l])
-	cur_b = place_chain(cur_b, [gf.components.straight(length=bottom_rise, cross_section=cs)])
-	cur_b = place_chain(cur_b, [bend_l])
-	straight_len_b = abs(cur_b.x - x_back)
-	cur_b = place_chain(cur_b, [gf.components.straight(length=straight_len_b, cross_section=cs)])
-	cur_b = place_chain(cur_b, [bend_r])
+	bottom_path = gf.path.straight(length=20)
+	bottom_path.append(_euler_path(90, 30.0))
+	add_straight(bottom_path, bottom_rise)
+	bottom_path.append(_euler_path(90, 30.0))
+	straight_len_b = abs(end_point(p_bottom, bottom_path)[0] - x_back)
+	add_straight(bottom_path, straight_len_b)
+	bottom_path.append(_euler_path(-90, 30.0))
 	# Connect to backbone bottom by a short straight if needed
-	join_len = abs(backbone_bottom.y - cur_b.y)
-	if join_len > 0:
-		cur_b = place_chain(cur_b, [gf.components.straight(length=max(1, join_len), cross_section=cs)])
+	join_len = abs(backbone_bottom_y - end_point(p_bottom, bottom_path)[1])
+	add_straight(bottom_path, join_len)
+	extrude_at(p_bottom, bottom_path)
 
 
 
@@ -478,13 +522,20 @@ def place_star_coupler_gcs(
 	"""
 	if not gc_refs:
 		return
-	gc_min_x = min(ref.dbbox().left for ref in gc_refs)
+
+	# One pass over the GC array: left edge and mean center y
+	gc_min_x = float("inf")
+	sum_y = 0.0
+	for ref in gc_refs:
+		bbox = ref.dbbox()
+		gc_min_x = min(gc_min_x, bbox.left)
+		sum_y += (bbox.top + bbox.bottom) / 2
 	
 	# Determine Y position: either center of all GCs or specific GC
 	if align_gc_index is not None and 0 <= align_gc_index < len(gc_refs):
 		gc_center_y = gc_refs[align_gc_index].center[1]
 	else:
-		gc_center_y = sum(ref.center[1] for ref in gc_refs) / len(gc_refs)
+		gc_center_y = sum_y / len(gc_refs)
 
 	star_bbox = star_ref.dbbox()
 	star_center_y = (star_bbox.top + star_bbox.bottom) / 2
@@ -493,6 +544,27 @@ def place_star_coupler_gcs(
 	star_ref.move((dx, dy))
 
 
+def _split_port_pairs(
+	ports_a: list,
+	ports_b: list,
+	s_bend_indices,
+) -> tuple[list, list, list, list]:
+	"""Split paired port lists into bundle and S-bend groups in one pass.
+
+	Returns (bundle_a, bundle_b, sbend_a, sbend_b); pair i goes to the S-bend
+	group when i is in s_bend_indices.
+	"""
+	bundle_a, bundle_b, sbend_a, sbend_b = [], [], [], []
+	for i, (port_a, port_b) in enumerate(zip(ports_a, ports_b)):
+		if i in s_bend_indices:
+			sbend_a.append(port_a)
+			sbend_b.append(port_b)
+		else:
+			bundle_a.append(port_a)
+			bundle_b.append(port_b)
+	return bundle_a, bundle_b, sbend_a, sbend_b
+
+
 def connect_star_coupler_inputs_to_gcs(
 	circuit: gf.Component,
 	star_ref: gf.ComponentReference,
@@ -505,16 +577,18 @@ def connect_star_coupler_inputs_to_gcs(
 	"""Route star coupler input ports to the GC array starting at IN2.
 
 	Mapping: top star port -> IN2, bottom star port -> IN6 (top-to-bottom order).
+	All ports not listed in s_bend_indices go through a single route_bundle call.
 	"""
+	# None means "no S-bend port": everything is routed in the bundle
+	s_bend_indices = frozenset(s_bend_indices or ())
 	input_ports = [port for port in star_ref.ports if port.name.startswith("i")]
 	input_ports.sort(key=lambda p: p.center[1], reverse=True)
 
+	# GC slice paired with the inputs (IN2, IN3, ... in placement order)
+	gc_slice = gc_refs[start_gc_index : start_gc_index + len(input_ports)]
 	gc_ports = []
-	for i in range(len(input_ports)):
-		gc_index = start_gc_index + i
-		if gc_index >= len(gc_refs):
-			break
-		gc_port = list(gc_refs[gc_index].ports)[0]
+	for gc_index, gc_ref in enumerate(gc_slice, start=start_gc_index):
+		gc_port = _gc_port(gc_ref)
 		gc_ports.append(
 			gf.Port(
 				name=f"gc_{gc_index}",
@@ -524,6 +598,9 @@ def connect_star_coupler_inputs_to_gcs(
 				layer=gf.get_layer(SIN_LAYER),
 			)
 		)
+	# Sorted once, top to bottom: normalization below only extends ports
+	# along their (shared) orientation, so it keeps this order
+	gc_ports.sort(key=lambda p: p.center[1], reverse=True)
 
 	if input_ports and gc_ports:
 		count = min(len(input_ports), len(gc_ports))
@@ -533,11 +610,7 @@ def connect_star_coupler_inputs_to_gcs(
 		# Normalize widths and orientations for S-bend routing (expects same orientation)
 		target_orientation = int(gc_ports[0].orientation)
 		target_width = min([p.width for p in (input_ports + gc_ports)])
-		cs = gf.cross_section.cross_section(
-			layer=input_ports[0].layer,
-			width=target_width,
-			radius=bend_radius,
-		)
+		cs = _sin_cross_section(target_width, bend_radius)
 		input_ports_norm = [
 			flip_port_orientation(
 				circuit,
@@ -555,16 +628,11 @@ def connect_star_coupler_inputs_to_gcs(
 			for port in gc_ports
 		]
 
-		# Keep a deterministic top-to-bottom pairing
-		input_ports_norm.sort(key=lambda p: p.center[1], reverse=True)
-		gc_ports_norm.sort(key=lambda p: p.center[1], reverse=True)
-
 		# Use S-bend for selected input ports (top-to-bottom indices)
 		
-		bundle_in = [p for i, p in enumerate(input_ports_norm) if i not in s_bend_indices]
-		bundle_gc = [p for i, p in enumerate(gc_ports_norm) if i not in s_bend_indices]
-		sbend_in = [p for i, p in enumerate(input_ports_norm) if i in s_bend_indices]
-		sbend_gc = [p for i, p in enumerate(gc_ports_norm) if i in s_bend_indices]
+		bundle_in, bundle_gc, sbend_in, sbend_gc = _split_port_pairs(
+			input_ports_norm, gc_ports_norm, s_bend_indices
+		)
 
 		# Push bends to the right by extending GC-side ports (bundle only)
 		bundle_gc = [extend_port(circuit, p, distance_GC_first_bend) for p in bundle_gc]
@@ -625,11 +693,13 @@ def _route_outputs_power_mode(
 		)
 		for port in output_ports
 	]
+	# Sorted once, top to bottom: normalization below only extends ports
+	# along their (shared) orientation, so it keeps this order
 	output_ports.sort(key=lambda p: p.center[1], reverse=True)
 
 	gc_ports = []
 	for ref in gc_refs_for_outputs:
-		gc_port = list(ref.ports)[0]
+		gc_port = _gc_port(ref)
 		gc_ports.append(
 			gf.Port(
 				name=gc_port.name,
@@ -648,11 +718,7 @@ def _route_outputs_power_mode(
 	# Normalize widths and orientations for routing
 	target_orientation = int(gc_ports[0].orientation)
 	target_width = min([p.width for p in (output_ports + gc_ports)])
-	cs = gf.cross_section.cross_section(
-		layer=output_ports[0].layer,
-		width=target_width,
-		radius=50.0,
-	)
+	cs = _sin_cross_section(target_width, 50.0)
 	output_ports_norm = [
 		flip_port_orientation(
 			circuit,
@@ -670,13 +736,9 @@ def _route_outputs_power_mode(
 		for port in gc_ports
 	]
 
-	output_ports_norm.sort(key=lambda p: p.center[1], reverse=True)
-	gc_ports_norm.sort(key=lambda p: p.center[1], reverse=True)
-	
-	bundle_out = [p for i, p in enumerate(output_ports_norm) if i not in s_bend_indices]
-	bundle_gc = [p for i, p in enumerate(gc_ports_norm) if i not in s_bend_indices]
-	sbend_out = [p for i, p in enumerate(output_ports_norm) if i in s_bend_indices]
-	sbend_gc = [p for i, p in enumerate(gc_ports_norm) if i in s_bend_indices]
+	bundle_out, bundle_gc, sbend_out, sbend_gc = _split_port_pairs(
+		output_ports_norm, gc_ports_norm, s_bend_indices
+	)
 
 	# Push bundle bends away from GC ports (OUT2/OUT5)
 	bundle_gc = [extend_port(circuit, p, bundle_routing_gap) for p in bundle_gc]
@@ -732,7 +794,7 @@ def add_mmi_coupler(
 		Dict with 'ref' and 'ports' (input and output ports).
 	"""
 
-	mmi = my_mmi_3db()
+	mmi = _get_mmi_3db()
 	mmi_ref = circuit << mmi
 	
 	# Position and rotate
@@ -751,6 +813,16 @@ def add_mmi_coupler(
 	return ports_dict
 
 
+def _snap_length(length: float) -> float:
+	"""Snap a length to the layout grid (dbu).
+
+	Lengths that only differ by float noise then map to the same straight
+	cell instead of producing near-duplicate cells.
+	"""
+	dbu = gf.kcl.dbu
+	return round(round(length / dbu) * dbu, 6)
+
+
 def route_with_loop(
 	circuit: gf.Component,
 	port_start: gf.Port,
@@ -783,11 +855,7 @@ def route_with_loop(
 		Final port after routing.
 	"""
 	if cross_section is None:
-		cross_section = gf.cross_section.cross_section(
-			layer=port_start.layer,
-			width=port_start.width,
-			radius=bend_radius,
-		)
+		cross_section = _port_cross_section(port_start.layer, port_start.width, bend_radius)
 	
 	# Calculate bend arc length (90° bend = pi * r / 2)
 	bend_arc_length = 3.14159 * bend_radius / 2
@@ -822,9 +890,9 @@ def route_with_loop(
 		error = total_length - target_length
 		
 		if abs(error) < tolerance:
-			print(
-				f"[DEBUG] route_with_loop converged: loop_height={loop_height:.2f} um, "
-				f"total={total_length:.2f} um (error={error:.3f} um)"
+			logger.debug(
+				"route_with_loop converged: loop_height=%.2f um, total=%.2f um (error=%.3f um)",
+				loop_height, total_length, error,
 			)
 			break
 		
@@ -836,21 +904,21 @@ def route_with_loop(
 			loop_height_min = loop_height
 			loop_height = (loop_height + loop_height_max) / 2
 	else:
-		print(f"[WARNING] route_with_loop did not converge after {max_iterations} iterations. Final error: {error:.3f} um")
+		logger.warning("route_with_loop did not converge after %d iterations. Final error: %.3f um", max_iterations, error)
 	
 	# Build the route with optimized loop height
 	h2, h4, dy_return, total_length = _compute_lengths(loop_height)
 	
-	print(
-		f"[DEBUG] route_with_loop: h1={h1}, h2={h2:.2f}, h3={h3}, h4={h4:.2f}, "
-		f"dy_return={dy_return:.2f}, bends={total_bend_length:.2f}, total={total_length:.2f}"
+	logger.debug(
+		"route_with_loop: h1=%s, h2=%.2f, h3=%s, h4=%.2f, dy_return=%.2f, bends=%.2f, total=%.2f",
+		h1, h2, h3, h4, dy_return, total_bend_length, total_length,
 	)
 	
 	current_port = port_start
 	
 	# Segment 1: Initial straight (RIGHT)
 	if h1 > 0.1:
-		s1 = circuit << gf.components.straight(length=h1, cross_section=cross_section)
+		s1 = circuit << gf.components.straight(length=_snap_length(h1), cross_section=cross_section)
 		s1.connect("o1", current_port)
 		current_port = s1.ports["o2"]
 	
@@ -858,51 +926,51 @@ def route_with_loop(
 	loop_angle = 90 if loop_side == "north" else -90
 	
 	# Segment 2: Bend into loop (UP or DOWN)
-	b1 = circuit << gf.components.bend_euler(angle=loop_angle, cross_section=cross_section, radius=bend_radius)
+	b1 = circuit << _bend_euler(loop_angle, bend_radius, cross_section)
 	b1.connect("o1", current_port)
 	current_port = b1.ports["o2"]
 	
 	# Segment 3: Vertical segment (UP or DOWN)
 	if h2 > 0.1:
-		s2 = circuit << gf.components.straight(length=h2, cross_section=cross_section)
+		s2 = circuit << gf.components.straight(length=_snap_length(h2), cross_section=cross_section)
 		s2.connect("o1", current_port)
 		current_port = s2.ports["o2"]
 	
 	# Segment 4: Bend toward destination (RIGHT)
-	b2 = circuit << gf.components.bend_euler(angle=-loop_angle, cross_section=cross_section, radius=bend_radius)
+	b2 = circuit << _bend_euler(-loop_angle, bend_radius, cross_section)
 	b2.connect("o1", current_port)
 	current_port = b2.ports["o2"]
 	
 	# Segment 5: Horizontal across loop (RIGHT)
 	if h3 > 0.1:
-		s3 = circuit << gf.components.straight(length=h3, cross_section=cross_section)
+		s3 = circuit << gf.components.straight(length=_snap_length(h3), cross_section=cross_section)
 		s3.connect("o1", current_port)
 		current_port = s3.ports["o2"]
 	
 	# Segment 6: Bend back to destination level (DOWN or UP)
-	b3 = circuit << gf.components.bend_euler(angle=-loop_angle, cross_section=cross_section, radius=bend_radius)
+	b3 = circuit << _bend_euler(-loop_angle, bend_radius, cross_section)
 	b3.connect("o1", current_port)
 	current_port = b3.ports["o2"]
 	
 	# Segment 7: Descend/ascend to destination Y (accounting for next bend offset)
 	if dy_return > 0.1:
-		s4 = circuit << gf.components.straight(length=dy_return, cross_section=cross_section)
+		s4 = circuit << gf.components.straight(length=_snap_length(dy_return), cross_section=cross_section)
 		s4.connect("o1", current_port)
 		current_port = s4.ports["o2"]
 	
 	# Segment 8: Final bend toward destination (RIGHT)
-	b4 = circuit << gf.components.bend_euler(angle=loop_angle, cross_section=cross_section, radius=bend_radius)
+	b4 = circuit << _bend_euler(loop_angle, bend_radius, cross_section)
 	b4.connect("o1", current_port)
 	current_port = b4.ports["o2"]
 	
 	# Segment 9: Final straight to destination
 	dx_final = port_end.center[0] - current_port.center[0]
 	if dx_final > 0.1:
-		s5 = circuit << gf.components.straight(length=dx_final, cross_section=cross_section)
+		s5 = circuit << gf.components.straight(length=_snap_length(dx_final), cross_section=cross_section)
 		s5.connect("o1", current_port)
 		current_port = s5.ports["o2"]
 	
-	print(f"[DEBUG] route_with_loop final position: {current_port.center}")
+	logger.debug("route_with_loop final position: %s", current_port.center)
 	return current_port
 
 
@@ -972,17 +1040,13 @@ def route_arms_to_mmi(
 ) -> dict:
 	"""Route short/long arms from start ports to MMI top/bottom ports."""
 	if cross_section is None:
-		cross_section = gf.cross_section.cross_section(
-			layer=short_start.layer,
-			width=short_start.width,
-			radius=bend_radius,
-		)
+		cross_section = _port_cross_section(short_start.layer, short_start.width, bend_radius)
 
 	L_SHORT = short_length
 	L_LONG = short_length + delta_L
 
 	# Short arm
-	short_arm = gf.components.straight(length=L_SHORT, cross_section=cross_section)
+	short_arm = gf.components.straight(length=_snap_length(L_SHORT), cross_section=cross_section)
 	short_ref = circuit << short_arm
 	short_ref.connect("o1", short_start)
 	short_end = short_ref.ports["o2"]
@@ -991,7 +1055,7 @@ def route_arms_to_mmi(
 	dx_short_gap = mmi_bot_port.center[0] - short_end.center[0]
 	if abs(dx_short_gap) > 0.1:
 		short_connector = circuit << gf.components.straight(
-			length=abs(dx_short_gap),
+			length=_snap_length(abs(dx_short_gap)),
 			cross_section=cross_section,
 		)
 		short_connector.connect("o1", short_end)
@@ -1014,7 +1078,7 @@ def route_arms_to_mmi(
 	dx_long_gap = abs(mmi_top_port.center[0] - current_port.center[0])
 	if dx_long_gap > 0.1:
 		long_connector = circuit << gf.components.straight(
-			length=dx_long_gap,
+			length=_snap_length(dx_long_gap),
 			cross_section=cross_section,
 		)
 		long_connector.connect("o1", current_port)
@@ -1048,11 +1112,7 @@ def _route_single_phase_mzi(
 		loop_side: Direction of loop ("north" or "south").
 	"""
 	target_width = 0.75
-	cs_phase = gf.cross_section.cross_section(
-		layer=SIN_LAYER,
-		width=target_width,
-		radius=bend_radius,
-	)
+	cs_phase = _sin_cross_section(target_width, bend_radius)
 
 	# Normalize port widths (SC outputs are 1000 nm, need 750 nm)
 	out_long_norm = normalize_port_width(circuit, out_long_port, target_width, length=10.0)
@@ -1080,14 +1140,14 @@ def _route_single_phase_mzi(
 			rotation=180.0,
 		)
 	except ValueError as exc:
-		print(f"[ERROR] Failed to place MMI: {exc}")
+		logger.error("Failed to place MMI: %s", exc)
 		return
 
 	# Identify MMI input ports
 	port_o2 = mmi_ports.get("o2", None)
 	port_o3 = mmi_ports.get("o3", None)
 	if not (port_o2 and port_o3):
-		print("[ERROR] MMI ports o2/o3 not found")
+		logger.error("MMI ports o2/o3 not found")
 		return
 	
 	mmi_top_port = max([port_o2, port_o3], key=lambda p: p.center[1])
@@ -1120,14 +1180,14 @@ def _route_single_phase_mzi(
 	# Provide MMI output port to caller for bundle routing
 	mmi_single_out_port = mmi_ports.get("o1", None)
 	if not mmi_single_out_port:
-		print("[ERROR] MMI output port o1 not found")
+		logger.error("MMI output port o1 not found")
 		return None
 
 	mmi_out_compatible = _make_port_compatible(mmi_single_out_port, SIN_LAYER, target_width)
 
-	print(
-		f"[DEBUG] Phase MZI: L_SHORT={result['L_SHORT']} um, "
-		f"L_LONG={result['L_LONG']} um, delta_L={delta_L} um, loop={loop_side}"
+	logger.debug(
+		"Phase MZI: L_SHORT=%s um, L_LONG=%s um, delta_L=%s um, loop=%s",
+		result["L_SHORT"], result["L_LONG"], delta_L, loop_side,
 	)
 
 	return mmi_out_compatible
@@ -1164,7 +1224,7 @@ def _route_outputs_phase_mode(
 	# Get star coupler output ports
 	output_ports = [p for p in star_ref.ports if p.name.startswith("out")]
 	if len(output_ports) < 2:
-		print("[WARN] Phase mode needs at least 2 output ports")
+		logger.warning("Phase mode needs at least 2 output ports")
 		return
 
 	# Sort top to bottom
@@ -1191,7 +1251,7 @@ def _route_outputs_phase_mode(
 	
 	# Ensure gc_output_refs is provided
 	if gc_output_refs is None:
-		print("[ERROR] gc_output_refs must be provided")
+		logger.error("gc_output_refs must be provided")
 		return
 
 	# Collect MMI output ports for bundle routing
@@ -1201,7 +1261,7 @@ def _route_outputs_phase_mode(
 	for pair_idx, (out_idx_long, out_idx_short) in enumerate(output_pairs):
 		# Validate indices
 		if out_idx_long >= len(output_ports) or out_idx_short >= len(output_ports):
-			print(f"[WARN] Output pair indices {(out_idx_long, out_idx_short)} out of range")
+			logger.warning("Output pair indices %s out of range", (out_idx_long, out_idx_short))
 			continue
 
 		# Get ports
@@ -1211,7 +1271,7 @@ def _route_outputs_phase_mode(
 		# Alternate loop direction: north for even pairs, south for odd
 		loop_side = "north" if pair_idx % 2 == 0 else "south"
 		
-		print(f"[DEBUG] Phase MZI pair {pair_idx}: SC[{out_idx_long},{out_idx_short}] (loop={loop_side})")
+		logger.debug("Phase MZI pair %d: SC[%d,%d] (loop=%s)", pair_idx, out_idx_long, out_idx_short, loop_side)
 		
 		# Route this MZI
 		mmi_out = _route_single_phase_mzi(
@@ -1231,14 +1291,14 @@ def _route_outputs_phase_mode(
 
 	# Route MMI outputs to GC outputs as a bundle (avoid overlaps)
 	if not mmi_out_ports:
-		print("[WARN] No MMI outputs to route")
+		logger.warning("No MMI outputs to route")
 		return
 
 	# Build GC output port list
 	if gc_output_indices is None:
 		# Auto: top-to-bottom order
 		gc_ports_sorted = sorted(
-			[list(ref.ports)[0] for ref in gc_output_refs],
+			[_gc_port(ref) for ref in gc_output_refs],
 			key=lambda p: p.center[1],
 			reverse=True,
 		)
@@ -1249,14 +1309,14 @@ def _route_outputs_phase_mode(
 		gc_ports = []
 		for idx in gc_output_indices[:len(mmi_out_ports)]:
 			if idx >= len(gc_output_refs):
-				print(f"[WARN] GC output index {idx} out of range")
+				logger.warning("GC output index %s out of range", idx)
 				continue
-			gc_ports.append(list(gc_output_refs[idx].ports)[0])
+			gc_ports.append(_gc_port(gc_output_refs[idx]))
 		mmi_ports_ordered = mmi_out_ports
 		sort_ports = False
 
 	if len(gc_ports) != len(mmi_ports_ordered):
-		print("[WARN] Mismatch between MMI outputs and GC outputs for bundle routing")
+		logger.warning("Mismatch between MMI outputs and GC outputs for bundle routing")
 		return
 
 	# Normalize GC ports to SIN layer
@@ -1264,11 +1324,7 @@ def _route_outputs_phase_mode(
 		_make_port_compatible(p, SIN_LAYER, 0.75) for p in gc_ports
 	]
 
-	cs_phase = gf.cross_section.cross_section(
-		layer=SIN_LAYER,
-		width=0.75,
-		radius=25.0,
-	)
+	cs_phase = _sin_cross_section(0.75, 25.0)
 
 	gf.routing.route_bundle(
 		circuit,
@@ -1285,22 +1341,22 @@ def _route_outputs_phase_mode(
 	if direct_sc_to_gc_routes:
 		for sc_idx, gc_idx in direct_sc_to_gc_routes:
 			if sc_idx >= len(output_ports):
-				print(f"[WARN] SC output index {sc_idx} out of range")
+				logger.warning("SC output index %s out of range", sc_idx)
 				continue
 			if gc_idx >= len(gc_output_refs):
-				print(f"[WARN] GC output index {gc_idx} out of range")
+				logger.warning("GC output index %s out of range", gc_idx)
 				continue
 			
 			# Get SC output port and GC port
 			sc_out = output_ports[sc_idx]
-			gc_port = list(gc_output_refs[gc_idx].ports)[0]
+			gc_port = _gc_port(gc_output_refs[gc_idx])
 			
 			# Normalize widths
 			sc_out_norm = normalize_port_width(circuit, sc_out, 0.75, length=10.0)
 			gc_port_compatible = _make_port_compatible(gc_port, SIN_LAYER, 0.75)
 			gc_port_norm = normalize_port_width(circuit, gc_port_compatible, 0.75, length=10.0)
 			
-			print(f"[DEBUG] Direct route: SC output {sc_idx} → GC output {gc_idx}")
+			logger.debug("Direct route: SC output %s → GC output %s", sc_idx, gc_idx)
 			
 			# Check if this route might cross MZI regions (lower outputs)
 			# If sc_idx is in the lower half of outputs, add waypoints to avoid MZI
@@ -1312,58 +1368,58 @@ def _route_outputs_phase_mode(
 				
 				# Step 1: Go straight right a bit
 				dx1 = 0.0
-				s1 = circuit << gf.components.straight(length=dx1, cross_section=cs_phase)
+				s1 = circuit << gf.components.straight(length=_snap_length(dx1), cross_section=cs_phase)
 				s1.connect("o1", current_port)
 				current_port = s1.ports["o2"]
 				
 				# Step 2: Bend down
-				b1 = circuit << gf.components.bend_euler(angle=-90, cross_section=cs_phase, radius=50.0)
+				b1 = circuit << _bend_euler(-90, 50.0, cs_phase)
 				b1.connect("o1", current_port)
 				current_port = b1.ports["o2"]
 				
 				# Step 3: Go down to avoid MZI
 				dy_avoid = 0.0
-				s2 = circuit << gf.components.straight(length=dy_avoid, cross_section=cs_phase)
+				s2 = circuit << gf.components.straight(length=_snap_length(dy_avoid), cross_section=cs_phase)
 				s2.connect("o1", current_port)
 				current_port = s2.ports["o2"]
 				
 				# Step 4: Bend right
-				b2 = circuit << gf.components.bend_euler(angle=90, cross_section=cs_phase, radius=50.0)
+				b2 = circuit << _bend_euler(90, 50.0, cs_phase)
 				b2.connect("o1", current_port)
 				current_port = b2.ports["o2"]
 				
 				# Step 5: Go right towards GC
 				dx2 = gc_port_norm.center[0] - current_port.center[0] - 100.0 - 100.0
 				if dx2 > 1.0:
-					s3 = circuit << gf.components.straight(length=dx2, cross_section=cs_phase)
+					s3 = circuit << gf.components.straight(length=_snap_length(dx2), cross_section=cs_phase)
 					s3.connect("o1", current_port)
 					current_port = s3.ports["o2"]
 				
 				# Step 6: Bend up
-				b3 = circuit << gf.components.bend_euler(angle=90, cross_section=cs_phase, radius=50.0)
+				b3 = circuit << _bend_euler(90, 50.0, cs_phase)
 				b3.connect("o1", current_port)
 				current_port = b3.ports["o2"]
 				
 				# Step 7: Go up to target Y level
 				dy_return = abs(gc_port_norm.center[1] - current_port.center[1]) - 50.0
 				if dy_return > 1.0:
-					s4 = circuit << gf.components.straight(length=dy_return, cross_section=cs_phase)
+					s4 = circuit << gf.components.straight(length=_snap_length(dy_return), cross_section=cs_phase)
 					s4.connect("o1", current_port)
 					current_port = s4.ports["o2"]
 				
 				# Step 8: Bend right
-				b4 = circuit << gf.components.bend_euler(angle=-90, cross_section=cs_phase, radius=50.0)
+				b4 = circuit << _bend_euler(-90, 50.0, cs_phase)
 				b4.connect("o1", current_port)
 				current_port = b4.ports["o2"]
 				
 				# Step 9: Final straight to GC
 				dx_final = gc_port_norm.center[0] - current_port.center[0]
 				if dx_final > 1.0:
-					s5 = circuit << gf.components.straight(length=dx_final, cross_section=cs_phase)
+					s5 = circuit << gf.components.straight(length=_snap_length(dx_final), cross_section=cs_phase)
 					s5.connect("o1", current_port)
 					current_port = s5.ports["o2"]
 				
-				print(f"[DEBUG] Used obstacle avoidance manual routing")
+				logger.debug("Used obstacle avoidance manual routing")
 			else:
 				# Upper output - direct route should be fine
 				gf.routing.route_single(
@@ -1398,11 +1454,7 @@ def add_mzi_calibration(
 	mzi_circuit = gf.Component(f"mzi_calibration_{unique_id}")
 	
 	target_width = 0.75
-	cs_phase = gf.cross_section.cross_section(
-		layer=SIN_LAYER,
-		width=target_width,
-		radius=bend_radius,
-	)
+	cs_phase = _sin_cross_section(target_width, bend_radius)
 
 	# Normalize and extend ports from GC (force SiN layer)
 	in_port_base = _make_port_compatible(input_port, SIN_LAYER, input_port.width)
@@ -1438,12 +1490,12 @@ def add_mzi_calibration(
 			auto_taper=False,
 		)
 	else:
-		print("[ERROR] Splitter MMI port o1 not found")
+		logger.error("Splitter MMI port o1 not found")
 		return None
 	sp_o2 = splitter_ports.get("o2")
 	sp_o3 = splitter_ports.get("o3")
 	if not sp_o2 or not sp_o3:
-		print("[ERROR] Splitter MMI ports o2/o3 not found")
+		logger.error("Splitter MMI ports o2/o3 not found")
 		return None
 	sp_top = max([sp_o2, sp_o3], key=lambda p: p.center[1])
 	sp_bot = min([sp_o2, sp_o3], key=lambda p: p.center[1])
@@ -1460,7 +1512,7 @@ def add_mzi_calibration(
 	cb_o2 = combiner_ports.get("o2")
 	cb_o3 = combiner_ports.get("o3")
 	if not cb_o2 or not cb_o3:
-		print("[ERROR] Combiner MMI ports o2/o3 not found")
+		logger.error("Combiner MMI ports o2/o3 not found")
 		return None
 	cb_top = max([cb_o2, cb_o3], key=lambda p: p.center[1])
 	cb_bot = min([cb_o2, cb_o3], key=lambda p: p.center[1])
@@ -1545,7 +1597,7 @@ def add_mmi_splitter_calibration(
 	connect_gc_top_bottom_drawn(cal_circuit, gc_refs)
 
 	# 3) Place MMI relative to GC2 input port and route ports
-	target_gc2 = list(gc_refs[1].ports)[0]
+	target_gc2 = _gc_port(gc_refs[1])
 	mmi_ref, mmi_ports = place_mmi_aligned_to_port(
 		circuit=cal_circuit,
 		target_port=target_gc2,
@@ -1555,10 +1607,10 @@ def add_mmi_splitter_calibration(
 		rotation=0.0,
 	)
 
-	cs_sin = gf.cross_section.cross_section(layer=SIN_LAYER, width=0.75, radius=bend_radius)
+	cs_sin = _sin_cross_section(0.75, bend_radius)
 
 	# GC2 -> MMI input o1
-	gc2_port = _make_port_compatible(list(gc_refs[1].ports)[0], SIN_LAYER, 0.75)
+	gc2_port = _make_port_compatible(_gc_port(gc_refs[1]), SIN_LAYER, 0.75)
 	mmi_in = mmi_ports.get("o1")
 	if not mmi_in:
 		raise ValueError("MMI input port o1 not found")
@@ -1580,8 +1632,8 @@ def add_mmi_splitter_calibration(
 
 	mmi_out_sorted = sorted([mmi_o2, mmi_o3], key=lambda p: p.center[1], reverse=True)
 	gc_targets = [
-		_make_port_compatible(list(gc_refs[3].ports)[0], SIN_LAYER, 0.75),
-		_make_port_compatible(list(gc_refs[2].ports)[0], SIN_LAYER, 0.75),
+		_make_port_compatible(_gc_port(gc_refs[3]), SIN_LAYER, 0.75),
+		_make_port_compatible(_gc_port(gc_refs[2]), SIN_LAYER, 0.75),
 	]
 
 	gf.routing.route_bundle(
@@ -1630,18 +1682,14 @@ def add_material_loss_calibration(
 		output_extension: Extension length before output GC (um).
 	"""
 	# Create cross-section for the waveguide
-	cs_wg = gf.cross_section.cross_section(
-		layer=waveguide_layer,
-		width=waveguide_width,
-		radius=bend_radius,
-	)
+	cs_wg = _port_cross_section(waveguide_layer, waveguide_width, bend_radius)
 	
 	# Add input grating coupler
 	gc_input = _get_sin_grating_coupler()
 	gc_in_ref = circuit << gc_input
 	gc_in_ref.rotate(180)
 	gc_in_ref.move(input_gc_origin)
-	input_port = list(gc_in_ref.ports)[0]
+	input_port = _gc_port(gc_in_ref)
 	
 	# Add label for input
 	add_port_label(
@@ -1660,7 +1708,7 @@ def add_material_loss_calibration(
 	in_port_wg = _make_port_compatible(in_port, waveguide_layer, waveguide_width)
 	
 	# Add straight waveguide section
-	straight_wg = gf.components.straight(length=waveguide_length, cross_section=cs_wg)
+	straight_wg = gf.components.straight(length=_snap_length(waveguide_length), cross_section=cs_wg)
 	wg_ref = circuit << straight_wg
 	wg_ref.connect("o1", in_port_wg)
 	out_port_wg = wg_ref.ports["o2"]
@@ -1675,7 +1723,7 @@ def add_material_loss_calibration(
 
 	# Position output GC at the end of the waveguide path, with vertical offset
 	gc_out_ref.move((out_port_wg.x, input_gc_origin[1] - gc_in_out_dy))
-	output_port = list(gc_out_ref.ports)[0]
+	output_port = _gc_port(gc_out_ref)
 	
 	# Add label for output
 	add_port_label(
@@ -1773,11 +1821,7 @@ def add_waveguide_loop_reference(
 		orientation: Loop direction "west" or "east" (default: "west").
 	"""
 	# Create cross-section for the waveguide
-	cs_loop = gf.cross_section.cross_section(
-		layer=waveguide_layer,
-		width=waveguide_width,
-		radius=bend_radius,
-	)
+	cs_loop = _port_cross_section(waveguide_layer, waveguide_width, bend_radius)
 	
 	# Create separate circuit for the loop with unique name
 	unique_id = str(uuid.uuid4())[:8]
@@ -1820,29 +1864,29 @@ def add_waveguide_loop_reference(
 		
 		# Segment 1: Horizontal to the left
 		if horizontal_segment_length > 0.1:
-			s1 = loop_circuit << gf.components.straight(length=horizontal_segment_length, cross_section=cs_loop)
+			s1 = loop_circuit << gf.components.straight(length=_snap_length(horizontal_segment_length), cross_section=cs_loop)
 			s1.connect("o1", current_port)
 			current_port = s1.ports["o2"]
 		
 		# Bend 1: Turn vertical (up or down based on output port height)
-		b1 = loop_circuit << gf.components.bend_euler(angle=vertical_angle, cross_section=cs_loop, radius=bend_radius)
+		b1 = loop_circuit << _bend_euler(vertical_angle, bend_radius, cs_loop)
 		b1.connect("o1", current_port)
 		current_port = b1.ports["o2"]
 		
 		# Segment 2: Vertical segment
 		if vertical_segment_length > 0.1:
-			s2 = loop_circuit << gf.components.straight(length=vertical_segment_length, cross_section=cs_loop)
+			s2 = loop_circuit << gf.components.straight(length=_snap_length(vertical_segment_length), cross_section=cs_loop)
 			s2.connect("o1", current_port)
 			current_port = s2.ports["o2"]
 		
 		# Bend 2: Turn back horizontal (to the right)
-		b2 = loop_circuit << gf.components.bend_euler(angle=vertical_angle, cross_section=cs_loop, radius=bend_radius)
+		b2 = loop_circuit << _bend_euler(vertical_angle, bend_radius, cs_loop)
 		b2.connect("o1", current_port)
 		current_port = b2.ports["o2"]
 		
 		# Segment 3: Horizontal to the right (back toward output)
 		if horizontal_segment_length > 0.1:
-			s3 = loop_circuit << gf.components.straight(length=horizontal_segment_length, cross_section=cs_loop)
+			s3 = loop_circuit << gf.components.straight(length=_snap_length(horizontal_segment_length), cross_section=cs_loop)
 			s3.connect("o1", current_port)
 			current_port = s3.ports["o2"]
 	
@@ -1852,29 +1896,29 @@ def add_waveguide_loop_reference(
 		
 		# Segment 1: Horizontal to the right
 		if horizontal_segment_length > 0.1:
-			s1 = loop_circuit << gf.components.straight(length=horizontal_segment_length, cross_section=cs_loop)
+			s1 = loop_circuit << gf.components.straight(length=_snap_length(horizontal_segment_length), cross_section=cs_loop)
 			s1.connect("o1", current_port)
 			current_port = s1.ports["o2"]
 		
 		# Bend 1: Turn vertical (up or down based on output port height)
-		b1 = loop_circuit << gf.components.bend_euler(angle=vertical_angle, cross_section=cs_loop, radius=bend_radius)
+		b1 = loop_circuit << _bend_euler(vertical_angle, bend_radius, cs_loop)
 		b1.connect("o1", current_port)
 		current_port = b1.ports["o2"]
 		
 		# Segment 2: Vertical segment
 		if vertical_segment_length > 0.1:
-			s2 = loop_circuit << gf.components.straight(length=vertical_segment_length, cross_section=cs_loop)
+			s2 = loop_circuit << gf.components.straight(length=_snap_length(vertical_segment_length), cross_section=cs_loop)
 			s2.connect("o1", current_port)
 			current_port = s2.ports["o2"]
 		
 		# Bend 2: Turn back horizontal (to the left, using -vertical_angle for correct direction)
-		b2 = loop_circuit << gf.components.bend_euler(angle=-vertical_angle, cross_section=cs_loop, radius=bend_radius)
+		b2 = loop_circuit << _bend_euler(-vertical_angle, bend_radius, cs_loop)
 		b2.connect("o1", current_port)
 		current_port = b2.ports["o2"]
 		
 		# Segment 3: Horizontal to the left (back toward output)
 		if horizontal_segment_length > 0.1:
-			s3 = loop_circuit << gf.components.straight(length=horizontal_segment_length, cross_section=cs_loop)
+			s3 = loop_circuit << gf.components.straight(length=_snap_length(horizontal_segment_length), cross_section=cs_loop)
 			s3.connect("o1", current_port)
 			current_port = s3.ports["o2"]
 	
@@ -1885,6 +1929,18 @@ def add_waveguide_loop_reference(
 	loop_ref = parent_cell << loop_circuit
 	
 
+# Named aliases accepted for generate_SC_circuit's output_gc_align_mode
+_OUTPUT_GC_ALIGN_MODES = MappingProxyType({
+	"top": 1,
+	"input_top": 1,
+	"match_input_top": 1,
+	"center_input": 2,
+	"input_center": 2,
+	"center_star": 4,
+	"star_center": 4,
+})
+
+
 def generate_SC_circuit(
 	parent_cell: gf.Component,
 	origin: tuple[float, float] = (0, 0),
@@ -1935,7 +1991,9 @@ def generate_SC_circuit(
 	"""
 	
 	# Create circuit sub-component with relative coordinates
-	circuit = gf.Component(f"SC_circuit_{int(origin[0])}_{int(origin[1])}")
+	circuit_index = next(_circuit_counter)
+	logger.info("Generating SC circuit %d at %s", circuit_index, origin)
+	circuit = gf.Component(f"SC_circuit_{circuit_index}")
 	
 	# Define relative positions within the circuit
 	input_gc_pos = (0, 0)
@@ -1973,33 +2031,24 @@ def generate_SC_circuit(
 	output_gc_count = num_outputs
 	output_ports = sc_ports.get("output_ports", [])
 	if output_ports:
-		max_x = max(p.center[0] for p in output_ports)
-		min_y = min(p.center[1] for p in output_ports)
-		max_y = max(p.center[1] for p in output_ports)
+		# One (N, 2) array of output port centers; extrema along each axis
+		centers = np.array([p.center for p in output_ports], dtype=float)
+		max_x = float(centers[:, 0].max())
+		min_y, max_y = float(centers[:, 1].min()), float(centers[:, 1].max())
 		star_outputs_center_y = (min_y + max_y) / 2.0
 	else:
 		star_bbox = sc_ports["ref"].dbbox()
 		max_x = star_bbox.right
 		star_outputs_center_y = (star_bbox.top + star_bbox.bottom) / 2.0
 
-	input_gc_centers_y = [ref.center[1] for ref in input_gc_refs]
-	input_gc_top_y = max(input_gc_centers_y) if input_gc_centers_y else 0.0
-	input_gc_center_y = (
-		(sum(input_gc_centers_y) / len(input_gc_centers_y)) if input_gc_centers_y else 0.0
-	)
+	input_gc_centers_y = np.array([ref.center[1] for ref in input_gc_refs], dtype=float)
+	input_gc_top_y = float(input_gc_centers_y.max()) if input_gc_centers_y.size else 0.0
+	input_gc_center_y = float(input_gc_centers_y.mean()) if input_gc_centers_y.size else 0.0
 
 	align_mode = output_gc_align_mode
 	if isinstance(align_mode, str):
 		align_mode = align_mode.strip().lower()
-		align_mode = {
-			"top": 1,
-			"input_top": 1,
-			"match_input_top": 1,
-			"center_input": 2,
-			"input_center": 2,
-			"center_star": 4,
-			"star_center": 4,
-		}.get(align_mode, 4)
+		align_mode = _OUTPUT_GC_ALIGN_MODES.get(align_mode, 4)
 
 	array_height = (output_gc_count - 1) * gc_pitch
 
@@ -2029,38 +2078,39 @@ def generate_SC_circuit(
 			idx = gc_index - 1
 			if idx < 0 or idx >= len(refs):
 				raise ValueError(f"GC index {gc_index} out of range for {kind} array")
-			gc_port = list(refs[idx].ports)[0]
+			gc_port = _gc_port(refs[idx])
 			circuit.add_port(name=port_name, port=gc_port)
 
 
-	# 4. Feature-specific output routing
+	# 4. Feature-specific output routing (nothing to route without output GCs)
 	mode = feature_mode.lower()
-	if mode == "power":
-		_route_outputs_power_mode(circuit, sc_ports["ref"], output_gc_refs, s_bend_indices=s_bend_output_indices)
-	elif mode == "amplitude_same_lenght":
-		_route_outputs_amplitude_same_length_mode(circuit, sc_ports["ref"], output_gc_refs)
-	elif mode == "phase":
-		_route_outputs_phase_mode(
-			circuit, 
-			sc_ports["ref"],
-			MMI_star_coupler_shift_x=phase_mmi_shift_x,
-			delta_L=phase_delta_L,
-			output_pairs=phase_output_pairs,
-			gc_output_indices=phase_gc_indices,
-			gc_output_refs=output_gc_refs,
-			gc_output_port_index_phase=gc_output_port_index_phase,
-			direct_sc_to_gc_routes=direct_sc_to_gc_routes,
-		)
-	else:
+	if mode not in {"power", "amplitude_same_lenght", "phase"}:
 		raise ValueError(
 			"feature_mode must be one of: power, amplitude_same_lenght, phase"
 		)
+	if output_gc_refs:
+		if mode == "power":
+			_route_outputs_power_mode(circuit, sc_ports["ref"], output_gc_refs, s_bend_indices=s_bend_output_indices)
+		elif mode == "amplitude_same_lenght":
+			_route_outputs_amplitude_same_length_mode(circuit, sc_ports["ref"], output_gc_refs)
+		elif mode == "phase":
+			_route_outputs_phase_mode(
+				circuit, 
+				sc_ports["ref"],
+				MMI_star_coupler_shift_x=phase_mmi_shift_x,
+				delta_L=phase_delta_L,
+				output_pairs=phase_output_pairs,
+				gc_output_indices=phase_gc_indices,
+				gc_output_refs=output_gc_refs,
+				gc_output_port_index_phase=gc_output_port_index_phase,
+				direct_sc_to_gc_routes=direct_sc_to_gc_routes,
+			)
 
 	# Routing: connect top GC to bottom GC following drawn path
 	try:
 		connect_gc_top_bottom_drawn(circuit, input_gc_refs)
-	except Exception as e:
-		print(f"[WARN] connect_gc_top_bottom_drawn failed: {e}")
+	except (KeyError, AttributeError, ValueError) as e:
+		logger.warning("connect_gc_top_bottom_drawn failed: %s", e)
 	
 	# Add circuit to parent cell at absolute origin position
 	circuit_ref = parent_cell << circuit
@@ -2087,13 +2137,37 @@ SEM_LAYER = (200, 0)
 
 
 def find_subdie_cell(cell: gf.Component, target_name: str) -> gf.Component | None:
-	"""Recursively search for a Sub_Die cell by name."""
-	for inst in cell.insts:
-		if target_name in inst.cell.name:
-			return inst.cell
-		result = find_subdie_cell(inst.cell, target_name)
-		if result:
-			return result
+	"""Search the hierarchy under cell for a Sub_Die cell by name.
+
+	The names of every cell below the root are first scanned in KLayout
+	(called_cells): no match returns None and a unique match is resolved
+	through one of its instances. Otherwise an iterative depth-first walk
+	returns the first match in instance order (same order as the original
+	recursive search), visiting cells shared by several instances only once.
+	"""
+	layout = cell.kcl.layout
+	matches = [ci for ci in cell.called_cells() if target_name in layout.cell_name(ci)]
+	if not matches:
+		return None
+	if len(matches) == 1:
+		target = matches[0]
+		parent = cell.kcl[next(layout.cell(target).each_parent_cell())]
+		return next(inst.cell for inst in parent.insts if inst.cell_index == target)
+
+	seen = {cell.name}
+	stack = [iter(cell.insts)]
+	while stack:
+		inst = next(stack[-1], None)
+		if inst is None:
+			stack.pop()
+			continue
+		child = inst.cell
+		if child.name in seen:
+			continue
+		if target_name in child.name:
+			return child
+		seen.add(child.name)
+		stack.append(iter(child.insts))
 	return None
 
 
@@ -2106,13 +2180,47 @@ def build_from_template(
 
 	Current modifications:
 	- Add SC circuit to Sub_Die_2 using new modular functions
-	"""
 
-	if not template_path.exists():
-		raise FileNotFoundError(f"Template GDS not found: {template_path}")
+	The build is cached per template file (resolved path + modification
+	time in ns + size), so repeated calls in the same session skip the GDS
+	import entirely. Each call returns a new top cell holding a single
+	reference to the cached build, so editing the result never changes
+	what later calls return.
+	"""
 
-	template = gf.import_gds(template_path, cellname=template_cellname)
+	try:
+		template_stat = template_path.stat()
+	except FileNotFoundError as e:
+		raise FileNotFoundError(f"Template GDS not found: {template_path}") from e
+
+	build = _build_from_template(
+		str(template_path.resolve()),
+		template_stat.st_mtime_ns,
+		template_stat.st_size,
+		template_cellname,
+		tuple(chip_origin),
+	)
 	chip = gf.Component("chip_layout")
+	chip.add_ref(build)
+	return chip
+
+
+@functools.lru_cache(maxsize=4)
+def _build_from_template(
+	template_path: str,
+	template_mtime_ns: int,
+	template_size: int,
+	template_cellname: str | None,
+	chip_origin: tuple[float, float],
+) -> gf.Component:
+	"""Cached body of build_from_template.
+
+	The circuits are added inside the imported Sub_Die_2 cell, i.e. the
+	template is modified in place, so the whole build is cached rather than
+	the bare import (reusing a populated template would add everything twice).
+	"""
+	template = gf.import_gds(Path(template_path), cellname=template_cellname)
+	chip = gf.Component(f"chip_layout_build_{next(_build_counter)}")
 	ref = chip << template
 
 
@@ -2256,36 +2364,71 @@ def build_from_template(
 		)
 
 	else:
-		print("[WARNING] Sub_Die_2 not found")
+		logger.warning("Sub_Die_2 not found")
 
 	return chip
 
 
-def export_gds(component: gf.Component, output_dir: Path = OUTPUT_DIR) -> Path:
-	"""Export the component to output/gds."""
+EXPORT_FORMATS = ("gds", "gds.gz", "oas")
+
+
+def export_gds(component: gf.Component, output_dir: Path = OUTPUT_DIR, fmt: str = "gds") -> Path:
+	"""Export the component to output/gds.
+
+	Args:
+		component: Layout to write.
+		output_dir: Destination folder.
+		fmt: "gds" (default, tape-out format), "gds.gz" (compressed GDS) or
+			"oas" (OASIS, much smaller and faster to write for repeated cells).
+	"""
+	if fmt not in EXPORT_FORMATS:
+		raise ValueError(f"fmt must be one of {EXPORT_FORMATS}, got {fmt!r}")
 
 	output_dir.mkdir(parents=True, exist_ok=True)
-	out_path = output_dir / "SC_circuit_layout.gds"
-	component.write_gds(out_path)
+	out_path = output_dir / f"SC_circuit_layout.{fmt}"
+	# Start from kfactory's defaults (no timestamps, no cell/file properties,
+	# max cell-name length) and only let KLayout pick the writer (GDS2/OASIS)
+	# and gzip compression from the file name
+	save_options = kf.save_layout_options()
+	save_options.set_format_from_filename(str(out_path))
+	# No metadata: the exported layout is a tape-out file, not a cell library
+	component.write_gds(out_path, with_metadata=False, save_options=save_options)
 	return out_path
 
 
-def main() -> None:
-    """Entry point for step 1."""
+def main(show: bool = False, formats: tuple[str, ...] = ("gds",)) -> None:
+    """Entry point for step 1.
+
+    Args:
+        show: Open the result in KLayout (skipped by default for batch runs).
+        formats: Output formats passed to export_gds, e.g. ("gds", "oas") to
+            write the tape-out GDS and a fast-loading OASIS copy side by side.
+    """
     
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
     # 1. Circuit construction
     chip = build_from_template()
     
     # 2. Export final GDS
-    out_path = export_gds(chip)
-    print(f"GDS exported to: {out_path}")
+    for fmt in formats:
+        out_path = export_gds(chip, fmt=fmt)
+        print(f"GDS exported to: {out_path}")
     
 
     cache_folder = ROOT_DIR / "build" / "oas" / "components"
     os.makedirs(cache_folder, exist_ok=True)
 
     # 3. Visualisation
-    chip.show()
+    if show:
+        chip.show()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the SC chip layout from the template GDS.")
+    parser.add_argument("--show", action="store_true", help="open the layout in KLayout after export")
+    parser.add_argument(
+        "--format", nargs="+", choices=EXPORT_FORMATS, default=["gds"],
+        help="output file format(s), e.g. --format gds oas",
+    )
+    args = parser.parse_args()
+    main(show=args.show, formats=tuple(args.format))
\ No newline at end of file
@@ -4,7 +4,6 @@ from klayout.db import LayerInfo
 from typing import Tuple, Optional, List
 from math import asin, sqrt, cos, sin, radians, degrees
 from shapely.geometry import Polygon as ShapelyPolygon
-import ubcpdk
 
 # ==============================================================================
 # "Manual Flattening" Version of the Star Coupler Components
@@ -373,9 +372,9 @@ def star_coupler(
 
     return c
 
-import ubcpdk
-
 if __name__ == "__main__":
+    import ubcpdk
+
     ubcpdk.PDK.activate()
     
     # 1. Create the Star Coupler
@@ -1,5 +1,8 @@
 import sys
 import os
+import glob
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import gdsfactory as gf
 import numpy as np
 
@@ -8,105 +11,94 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-# --- 1. CONFIGURATION DE L'API LUMERICAL ---
-lumerical_api_path = r"C:\Program Files\Lumerical\v252\api\python" 
-if lumerical_api_path not in sys.path:
-    sys.path.append(lumerical_api_path)
-
-import lumapi
 import ubcpdk
 from components.star_coupler import star_coupler
+# Chemins Lumerical: voir scripts/lumerical_session.py
+from lumerical_session import get_mode, close_sessions
 
-# --- 2. PRÉPARATION DU GDS ---
-print("="*70)
-print("CONFIGURATION VARFDTD - STAR COUPLER")
-print("="*70)
-
-print("\n[ÉTAPE 1] Génération du composant...")
-ubcpdk.PDK.activate()
-
-# Create the star coupler (now includes input/output waveguides)
-c = star_coupler(n_inputs=5, n_outputs=4)
-
-# Create output/gds folder if it doesn't exist
-gds_folder = os.path.join(project_root, "output", "gds")
-os.makedirs(gds_folder, exist_ok=True)
-gds_path = os.path.join(gds_folder, "star_coupler_for_mode.gds")
-c.write_gds(gds_path)
-print(f"  ✓ GDS sauvegardé: {gds_path}")
-
-# Récupération des positions des ports
-ports_info = {}
-for port in c.ports:
-    ports_info[port.name] = {
-        'center': port.center,
-        'width': port.width,
-        'orientation': port.orientation
-    }
-print(f"  ✓ {len(ports_info)} ports: {list(ports_info.keys())}")
-
-# --- 3. LANCEMENT DE LUMERICAL MODE ---
-print("\n[ÉTAPE 2] Préparation des simulations Lumerical...")
-
-# --- 4. CONFIGURATION DE LA STRUCTURE ---
-wg_height = 0.4e-6  # 400 nm SiN core (per NanoSOI specs)
-
-# Wavelength configuration (global)
-# TODO: Modify for final simulation
-
-wavelength_start = 1.55e-6
-wavelength_stop = 1.55e-6
 
-# Monitor coverage of the full component (used for index monitors)
-component_bbox = c.bbox()
-print(component_bbox)
-print(type(component_bbox))
-bbox_center_x = (component_bbox.left + component_bbox.right) / 2
-bbox_center_y = (component_bbox.bottom + component_bbox.top) / 2
-bbox_span_x = component_bbox.right - component_bbox.left
-bbox_span_y = component_bbox.top - component_bbox.bottom
+def activate_ubcpdk():
+    """Activate ubcpdk unless it is already the active PDK.
 
-# Create output folders
-fsp_folder = os.path.join(project_root, "output", "fsp")
-os.makedirs(fsp_folder, exist_ok=True)
-lms_folder = os.path.join(project_root, "output", "lms")
-os.makedirs(lms_folder, exist_ok=True)
-
-# Save a single FSP snapshot for reference (optional, no run)
-fsp_path = os.path.join(fsp_folder, "star_coupler_varFDTD.fsp")
-
-# Prepare list of input ports for per-source LMS generation
-input_ports = sorted([p for p in ports_info.keys() if p.startswith('i')])
-output_ports = sorted([p for p in ports_info.keys() if p.startswith('out')])
+    Re-activating re-registers every PDK cell, which adds up when main() or
+    run_varfdtd() are called repeatedly from the same (notebook) session.
+    """
+    try:
+        active_name = gf.get_active_pdk().name
+    except Exception:
+        active_name = None
+    if active_name != ubcpdk.PDK.name:
+        ubcpdk.PDK.activate()
 
-print(f"\n[ÉTAPE 2] Génération de {len(input_ports)} fichiers LMS (un par entrée)...")
 
-for port_name in input_ports:
-    print("\n" + "-"*70)
-    print(f"Configuration pour la source: {port_name}")
-    
-    mode = None
+def read_setup_key(key_path):
+    """Return the key stored in a sidecar file (LMS setup key, GDS hash), or None."""
     try:
-        mode = lumapi.MODE(hide=True)
-    except KeyboardInterrupt:
-        print(f"  ⚠ Interruption utilisateur")
-        if mode:
-            try:
-                mode.close()
-            except:
-                pass
-        break
-    except Exception as e:
-        print(f"  ✗ Erreur ouverture MODE: {e}")
-        continue
+        with open(key_path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def write_gds_if_changed(c, gds_path):
+    """Write the component GDS, keeping the existing file if its content is identical.
+
+    The hash of the written content is stored next to the file (``.hash``) so
+    unchanged layouts keep their mtime and Lumerical does not see a new file.
+    Returns the content hash (hex).
+    """
+    hash_path = gds_path + ".hash"
+    tmp_path = gds_path + ".tmp.gds"
+    c.write_gds(tmp_path)
+    with open(tmp_path, 'rb') as f:
+        new_hash = hashlib.blake2b(f.read()).hexdigest()
+
+    if os.path.exists(gds_path) and read_setup_key(hash_path) == new_hash:
+        os.remove(tmp_path)
+        print(f"  ✓ GDS inchangé, fichier conservé: {gds_path}")
+    else:
+        os.replace(tmp_path, gds_path)
+        with open(hash_path, 'w', encoding='utf-8') as f:
+            f.write(new_hash)
+        print(f"  ✓ GDS sauvegardé: {gds_path}")
+    return new_hash
+
+
+def get_ports_info(c):
+    """Return {port_name: {'center', 'width', 'orientation'}} for a component.
+
+    Orientations are normalized to [0, 360) once here, so later code reads a
+    plain value instead of re-normalizing on each access.
+    """
+    ports_info = {}
+    for port in c.ports:
+        ports_info[port.name] = {
+            'center': port.center,
+            'width': port.width,
+            'orientation': port.orientation % 360
+        }
+    return ports_info
+
+
+def setup_template(mode, cell_name, gds_path, ports_info, output_ports, bbox, config):
+    """Build the source-independent project: geometry, solver and monitors.
+
+    Returns False if a blocking step failed (geometry or solver).
+    """
+    wg_height = config['wg_height']
+    bbox_center_x, bbox_center_y, bbox_span_x, bbox_span_y = bbox
 
     try:
-        setup_script = f"""
+        # Paramètres passés en variables Lumerical (pas de chemin à échapper dans le script)
+        mode.putv("gds_path", gds_path.replace(os.sep, '/'))
+        mode.putv("cell_name", cell_name)
+        mode.putv("wg_h", wg_height)
+        setup_script = """
 deleteall;
 switchtolayout;
 
 # Import du GDS (couche SiN, SiePIC 4/0)
-gdsimport("{gds_path.replace(os.sep, '/')}", "{c.name}", "4:0", "Si3N4 (Silicon Nitride) - Luke", 0, {wg_height});
+gdsimport(gds_path, cell_name, "4:0", "Si3N4 (Silicon Nitride) - Luke", 0, wg_h);
 
 # Substrat SiO2 (BOX ~4.5 µm)
 addrect;
@@ -121,88 +113,37 @@ addrect;
 set("name", "SiO2_Overcladding");
 set("x", 0); set("y", 0);
 set("x span", 500e-6); set("y span", 500e-6);
-set("z min", {wg_height}); set("z max", {wg_height + 3e-6});
+set("z min", wg_h); set("z max", wg_h + 3e-6);
 set("material", "SiO2 (Glass) - Palik");
 """
         mode.eval(setup_script)
         print("  ✓ Géométrie importée")
     except Exception as e:
         print(f"  ✗ Erreur import: {e}")
-        mode.close()
-        continue
+        return False
 
     try:
         solver_script = f"""
 addvarfdtd;
 set("x", {0});
 set("y", {0});
-set("x span", {235.6e-6});
-set("y span", {175e-6});
+set("x span", {config['sim_x_span']});
+set("y span", {config['sim_y_span']});
 set("z", {-0.55e-6});  # Centered through BOX (4.5 µm) + core (0.4 µm) + 3 µm top cladding
 set("z span", {8.5e-6});
-set("simulation time", 5000e-15); 
-set("mesh accuracy", 5);
-set("index", 1.444);
+set("simulation time", {config['sim_time']});
+set("mesh accuracy", {config['mesh_accuracy']});
+set("index", {config['background_index']});
 set("auto shutoff min", 1.00e-5);
+
+# Points de fréquence des moniteurs: 1 seul si λ unique (pas de calcul inutile)
+setglobalmonitor("frequency points", {config['frequency_points']});
 """
-        # 5000e-15
         mode.eval(solver_script)
         print("  ✓ Solveur varFDTD configuré")
     except Exception as e:
         print(f"  ✗ Erreur solveur: {e}")
-        mode.close()
-        continue
-
-    # Sources (single active input per file)
-    try:
-        port = ports_info[port_name]
-        x, y = port['center']
-        # Place source directly at the port center (no axial offset)
-        x_m = x * 1e-6
-        y_m = y * 1e-6
-        # Keep default source vertical extent (do not set z / z span explicitly)
-        lateral_span = 2e-6
-        orientation = port['orientation']
-
-        if abs(orientation - 0) < 45 or abs(orientation - 360) < 45:
-            injection_axis = "x-axis"
-            direction = "Backward"
-        elif abs(orientation - 180) < 45:
-            injection_axis = "x-axis"
-            direction = "Forward"
-        elif abs(orientation - 90) < 45:
-            injection_axis = "y-axis"
-            direction = "Backward"
-        elif abs(orientation - 270) < 45:
-            injection_axis = "y-axis"
-            direction = "Forward"
-        else:
-            injection_axis = "x-axis"
-            direction = "Backward"
-
-        source_script = f"""
-addmodesource;
-set("name", "source_{port_name}");
-set("injection axis", "{injection_axis}");
-set("direction", "{direction}");
-set("x", {x_m});
-set("y", {y_m});
-set("y span", {lateral_span});
-set("wavelength start", {wavelength_start});
-set("wavelength stop", {wavelength_stop});
-set("mode selection", "fundamental mode");
-"""
-
-        if injection_axis == "y-axis":
-            # When injecting along y, set x span instead
-            source_script = source_script.replace(f"set(\"y span\", {lateral_span});", f"set(\"x span\", {lateral_span});")
-
-        mode.eval(source_script)
-        print(f"  ✓ Source ajoutée: {port_name}")
-    except Exception as e:
-        print(f"  ✗ Erreur source {port_name}: {e}")
-        mode.close()
-        continue
+        return False
 
     # Monitors
     monitor_y_span = 0.6e-6
@@ -216,8 +157,8 @@ set("name", "global_profile");
 set("monitor type", "2D Z-normal");
 set("x", 0);
 set("y", 0);
-set("x span", {235.6e-6});
-set("y span", {175e-6});
+set("x span", {config['sim_x_span']});
+set("y span", {config['sim_y_span']});
 set("z", {monitor_z_center});
 set("down sample X", 4);
 set("down sample Y", 4);
@@ -227,14 +168,13 @@ set("down sample Y", 4);
     except Exception as e:
         print(f"  ⚠ Erreur moniteur global: {e}")
 
-    for out_name in output_ports:
-        try:
-            port = ports_info[out_name]
-            x, y = port['center']
-            x_m = x * 1e-6
-            y_m = y * 1e-6
+    # Centres des sorties convertis en mètres en une seule opération (µm -> m)
+    output_centers_m = np.array([ports_info[n]['center'] for n in output_ports], dtype=float).reshape(-1, 2) * 1e-6
 
-            monitor_script = f"""
+    # Un seul mode.eval par famille de moniteurs (évite un aller-retour API par port)
+    monitor_scripts = []
+    for out_name, (x_m, y_m) in zip(output_ports, output_centers_m):
+        monitor_scripts.append(f"""
 adddftmonitor;
 set("name", "monitor_{out_name}");
 set("monitor type", 5);
@@ -243,24 +183,26 @@ set("y", {y_m});
 set("y span", {monitor_y_span});
 set("z", {monitor_z_center});
 set("z span", {monitor_z_span});
-"""
-            mode.eval(monitor_script)
-        except Exception as e:
-            print(f"  ⚠ Erreur moniteur {out_name}: {e}")
-    
+""")
+
+    try:
+        mode.eval("\n".join(monitor_scripts))
+    except Exception as e:
+        print(f"  ⚠ Erreur moniteurs de port (lot): {e}")
+        # Repli port par port pour identifier le moniteur fautif
+        for out_name, monitor_script in zip(output_ports, monitor_scripts):
+            try:
+                mode.eval(monitor_script)
+            except Exception as e:
+                print(f"  ⚠ Erreur moniteur {out_name}: {e}")
+
     # Add 2D frequency monitors (Z-normal) at each output port
     # Monitor is 2 μm larger than the 0.5 μm waveguide width in Y and Z directions
     output_monitor_y_span = 0.5e-6 + 2e-6  # waveguide width + 2 μm
-    output_monitor_z_span = wg_height + 2e-6  # waveguide height + 2 μm
-    
-    for out_name in output_ports:
-        try:
-            port = ports_info[out_name]
-            x, y = port['center']
-            x_m = x * 1e-6
-            y_m = y * 1e-6
 
-            output_monitor_script = f"""
+    output_monitor_scripts = []
+    for out_name, (x_m, y_m) in zip(output_ports, output_centers_m):
+        output_monitor_scripts.append(f"""
 adddftmonitor;
 set("name", "freq_monitor_{out_name}");
 set("monitor type", "2D X-normal");
@@ -268,11 +210,19 @@ set("x", {x_m});
 set("y", {y_m});
 set("y span", {output_monitor_y_span});
 set("z", {monitor_z_center});
-"""
-            mode.eval(output_monitor_script)
-            print(f"  ✓ Moniteur de fréquence 2D Z-normal ajouté: {out_name}")
-        except Exception as e:
-            print(f"  ⚠ Erreur moniteur de fréquence {out_name}: {e}")
+""")
+
+    try:
+        mode.eval("\n".join(output_monitor_scripts))
+        print(f"  ✓ Moniteurs de fréquence 2D ajoutés: {', '.join(output_ports)}")
+    except Exception as e:
+        print(f"  ⚠ Erreur moniteurs de fréquence (lot): {e}")
+        for out_name, output_monitor_script in zip(output_ports, output_monitor_scripts):
+            try:
+                mode.eval(output_monitor_script)
+                print(f"  ✓ Moniteur de fréquence 2D Z-normal ajouté: {out_name}")
+            except Exception as e:
+                print(f"  ⚠ Erreur moniteur de fréquence {out_name}: {e}")
     print(f"  ✓ {len(output_ports)} moniteurs de port ajoutés")
 
     # Field monitors covering the whole star coupler (for index/field analysis)
@@ -292,25 +242,369 @@ set("z", {wg_height/2});
     except Exception as e:
         print(f"  ⚠ Erreur moniteur de champ: {e}")
 
+    return True
+
+
+def add_input_source(mode, port_name, ports_info, config):
+    """Add the mode source of one input port (single active input per file).
+
+    Returns False if the source could not be added.
+    """
+    try:
+        port = ports_info[port_name]
+        x, y = port['center']
+        # Place source directly at the port center (no axial offset)
+        x_m = x * 1e-6
+        y_m = y * 1e-6
+        # Keep default source vertical extent (do not set z / z span explicitly)
+        lateral_span = 2e-6
+        orientation = port['orientation']
+
+        if abs(orientation - 0) < 45 or abs(orientation - 360) < 45:
+            injection_axis = "x-axis"
+            direction = "Backward"
+        elif abs(orientation - 180) < 45:
+            injection_axis = "x-axis"
+            direction = "Forward"
+        elif abs(orientation - 90) < 45:
+            injection_axis = "y-axis"
+            direction = "Backward"
+        elif abs(orientation - 270) < 45:
+            injection_axis = "y-axis"
+            direction = "Forward"
+        else:
+            injection_axis = "x-axis"
+            direction = "Backward"
+
+        source_script = f"""
+addmodesource;
+set("name", "source_{port_name}");
+set("injection axis", "{injection_axis}");
+set("direction", "{direction}");
+set("x", {x_m});
+set("y", {y_m});
+set("y span", {lateral_span});
+set("wavelength start", {config['wavelength_start']});
+set("wavelength stop", {config['wavelength_stop']});
+set("mode selection", "fundamental mode");
+"""
+
+        if injection_axis == "y-axis":
+            # When injecting along y, set x span instead
+            source_script = source_script.replace(f"set(\"y span\", {lateral_span});", f"set(\"x span\", {lateral_span});")
+
+        mode.eval(source_script)
+        print(f"  ✓ Source ajoutée: {port_name}")
+    except Exception as e:
+        print(f"  ✗ Erreur source {port_name}: {e}")
+        return False
+
+    return True
+
+
+def prepare_template_lms(template_path, cell_name, gds_path, ports_info, output_ports, bbox, config):
+    """Build the source-independent project once and save it as a template.
+
+    Returns the saved template path, or None on failure.
+    """
+    print("\n" + "-"*70)
+    print("Construction du modèle commun (géométrie, solveur, moniteurs)")
+
+    try:
+        mode = get_mode()
+    except Exception as e:
+        print(f"  ✗ Erreur ouverture MODE: {e}")
+        return None
+
+    if not setup_template(mode, cell_name, gds_path, ports_info, output_ports, bbox, config):
+        return None
+    try:
+        mode.save(template_path)
+        print(f"  ✓ Modèle sauvegardé: {template_path}")
+    except Exception as e:
+        print(f"  ✗ Erreur sauvegarde modèle: {e}")
+        return None
+    remove_stale_templates(template_path)
+    return template_path
+
+
+def remove_stale_templates(template_path):
+    """Delete the templates of previous setup keys next to template_path.
+
+    A new template is written each time the setup key changes; only the
+    current one is ever loaded again.
+    """
+    pattern = os.path.join(os.path.dirname(template_path), "star_coupler_template_*.lms")
+    current = os.path.abspath(template_path)
+    for path in glob.glob(pattern):
+        if os.path.abspath(path) == current:
+            continue
+        try:
+            os.remove(path)
+            print(f"  ✓ Ancien modèle supprimé: {path}")
+        except OSError as e:
+            print(f"  ⚠ Impossible de supprimer {path}: {e}")
+
+
+def prepare_input_lms(port_name, lms_path, setup_key, template_path, ports_info, config, fsp_path=None):
+    """Load the template in the shared MODE session, add one input source and save it.
+
+    Runs either in the main process or in a sweep worker process.
+    Returns the saved LMS path, or None on failure.
+    """
+    print("\n" + "-"*70)
+    print(f"Configuration pour la source: {port_name}")
+
+    try:
+        mode = get_mode()
+    except Exception as e:
+        print(f"  ✗ Erreur ouverture MODE: {e}")
+        return None
+
+    # Le modèle contient déjà la géométrie importée: pas de gdsimport ici
+    try:
+        mode.load(template_path)
+        mode.eval("switchtolayout;")
+    except Exception as e:
+        print(f"  ✗ Erreur chargement modèle: {e}")
+        return None
+
+    if not add_input_source(mode, port_name, ports_info, config):
+        return None
+
     # Sauvegarde LMS spécifique à l'entrée
-    lms_path = os.path.join(lms_folder, f"star_coupler_varFDTD_{port_name}.lms")
     try:
         mode.save(lms_path)
+        with open(lms_path + ".key", 'w', encoding='utf-8') as f:
+            f.write(setup_key)
         print(f"  ✓ Fichier sauvegardé: {lms_path}")
     except Exception as e:
         print(f"  ✗ Erreur sauvegarde LMS: {e}")
+        return None
 
     # Sauvegarde FSP de référence (écrasée à chaque fois, sans run)
-    try:
-        mode.save(fsp_path)
-    except Exception:
-        pass
+    if fsp_path:
+        try:
+            mode.save(fsp_path)
+        except Exception:
+            pass
+    return lms_path
 
+
+def _prepare_input_lms_worker(*job):
+    """prepare_input_lms for a pool worker, closing its session afterwards.
+
+    Worker processes exit without running atexit handlers, so the shared
+    session would otherwise be left open.
+    """
     try:
-        mode.close()
-    except Exception:
-        pass
+        return prepare_input_lms(*job)
+    finally:
+        close_sessions()
+
+
+def run_lms_batch(lms_paths):
+    """Solve several LMS files as one Lumerical job queue (addjob/runjobs).
+
+    The job manager dispatches the queued files itself (concurrently when the
+    resource configuration allows it), so the wall time is bounded by the
+    slowest input rather than the sum of all inputs. Results are stored in
+    each LMS file.
+    """
+    if not lms_paths:
+        return
+    print(f"\n[ÉTAPE 3] Lancement groupé de {len(lms_paths)} simulations...")
+    mode = get_mode()
+    mode.eval("clearjobs;\n" + "".join(
+        f'addjob("{path.replace(os.sep, "/")}");\n' for path in lms_paths
+    ) + "runjobs;")
+    print("  ✓ Simulations terminées")
+
+
+def run_varfdtd(
+    c,
+    *,
+    wg_height=0.4e-6,
+    wavelength_start=1.55e-6,
+    wavelength_stop=1.55e-6,
+    frequency_points=None,
+    sim_x_span=235.6e-6,
+    sim_y_span=175e-6,
+    sim_time=5000e-15,
+    mesh_accuracy=5,
+    background_index=1.444,
+    gds_name="star_coupler_for_mode.gds",
+    force_rerun=None,
+    workers=None,
+    run_batch=None,
+):
+    """Export a component and prepare one varFDTD LMS file per input port.
+
+    Args:
+        c: Component to simulate (input ports prefixed 'i', outputs 'out').
+        wg_height: SiN core thickness (m). 400 nm per NanoSOI specs.
+        wavelength_start, wavelength_stop: Source bandwidth (m).
+        frequency_points: Monitor frequency points. Defaults to 1 when
+            start == stop, else 51 (odd, so index 25 is the center wavelength).
+        sim_x_span, sim_y_span, sim_time, mesh_accuracy, background_index:
+            varFDTD region settings.
+        gds_name: GDS file name written to output/gds, or to the
+            LUMERICAL_TMP directory when that environment variable is set.
+        force_rerun: Regenerate LMS files even if their setup key matches.
+            Defaults to the FORCE_RERUN environment variable.
+        workers: Number of parallel MODE sessions (one process each) used to
+            prepare the inputs. Defaults to the LUM_WORKERS environment
+            variable, or 1 (serial).
+        run_batch: Solve the newly prepared LMS files in one Lumerical job
+            queue. Defaults to the LUM_RUN_BATCH environment variable (off).
+
+    Returns:
+        Dict {input_port_name: lms_path} for every prepared input.
+    """
+    if force_rerun is None:
+        force_rerun = os.environ.get("FORCE_RERUN", "0") == "1"
+    if workers is None:
+        workers = int(os.environ.get("LUM_WORKERS", "1"))
+    if run_batch is None:
+        run_batch = os.environ.get("LUM_RUN_BATCH", "0") == "1"
+
+    # Create output/gds folder if it doesn't exist. LUMERICAL_TMP permet de
+    # placer le GDS lu par gdsimport sur un disque local (projet sur partage réseau)
+    gds_folder = os.environ.get("LUMERICAL_TMP") or os.path.join(project_root, "output", "gds")
+    os.makedirs(gds_folder, exist_ok=True)
+    gds_path = os.path.join(gds_folder, gds_name)
+    gds_hash = write_gds_if_changed(c, gds_path)
+
+    # Récupération des positions des ports
+    ports_info = get_ports_info(c)
+    print(f"  ✓ {len(ports_info)} ports: {list(ports_info.keys())}")
+
+    print("\n[ÉTAPE 2] Préparation des simulations Lumerical...")
+
+    if frequency_points is None:
+        frequency_points = 1 if wavelength_start == wavelength_stop else 51
+
+    config = {
+        'wg_height': wg_height,
+        'wavelength_start': wavelength_start,
+        'wavelength_stop': wavelength_stop,
+        'frequency_points': frequency_points,
+        'sim_x_span': sim_x_span,
+        'sim_y_span': sim_y_span,
+        'sim_time': sim_time,
+        'mesh_accuracy': mesh_accuracy,
+        'background_index': background_index,
+    }
+
+    # Monitor coverage of the full component (used for index monitors)
+    component_bbox = c.bbox()
+    bbox = (
+        (component_bbox.left + component_bbox.right) / 2,
+        (component_bbox.bottom + component_bbox.top) / 2,
+        component_bbox.right - component_bbox.left,
+        component_bbox.top - component_bbox.bottom,
+    )
+
+    # Create output folders
+    fsp_folder = os.path.join(project_root, "output", "fsp")
+    os.makedirs(fsp_folder, exist_ok=True)
+    lms_folder = os.path.join(project_root, "output", "lms")
+    os.makedirs(lms_folder, exist_ok=True)
+
+    # Save a single FSP snapshot for reference (optional, no run)
+    fsp_path = os.path.join(fsp_folder, "star_coupler_varFDTD.fsp")
+
+    # Listes d'entrées/sorties calculées une seule fois et transmises telles
+    # quelles au modèle et aux sources
+    input_ports = sorted(p for p in ports_info if p.startswith('i'))
+    output_ports = sorted(p for p in ports_info if p.startswith('out'))
+
+    # Clé de configuration: contenu du GDS + paramètres de simulation.
+    # Un fichier LMS dont la clé est identique est conservé tel quel (résultats
+    # déjà calculés compris). FORCE_RERUN=1 force la régénération.
+    sim_config = (sorted(config.items()), sorted(ports_info.items()))
+    setup_key = hashlib.blake2b(gds_hash.encode() + repr(sim_config).encode()).hexdigest()[:16]
+
+    print(f"\n[ÉTAPE 2] Génération de {len(input_ports)} fichiers LMS (un par entrée)...")
+
+    lms_paths = {}
+    pending = []
+    for port_name in input_ports:
+        lms_path = os.path.join(lms_folder, f"star_coupler_varFDTD_{port_name}.lms")
+        if not force_rerun and os.path.exists(lms_path) and read_setup_key(lms_path + ".key") == setup_key:
+            print(f"  ✓ {port_name}: configuration inchangée ({setup_key}), fichier conservé: {lms_path}")
+            lms_paths[port_name] = lms_path
+            continue
+        pending.append((port_name, lms_path))
+
+    # Modèle commun (géométrie + solveur + moniteurs) construit une seule fois
+    # par clé de configuration; chaque entrée ne fait qu'y ajouter sa source.
+    template_folder = os.path.join(lms_folder, "templates")
+    os.makedirs(template_folder, exist_ok=True)
+    template_path = os.path.join(template_folder, f"star_coupler_template_{setup_key}.lms")
+    if pending and (force_rerun or not os.path.exists(template_path)):
+        if not prepare_template_lms(template_path, c.name, gds_path, ports_info, output_ports, bbox, config):
+            return lms_paths
+    elif pending:
+        print(f"  ✓ Modèle existant réutilisé: {template_path}")
+
+    # Arguments communs; seule la première entrée écrit le FSP de référence
+    # (évite que plusieurs workers écrivent le même fichier)
+    jobs = [
+        (port_name, lms_path, setup_key, template_path, ports_info, config,
+         fsp_path if i == 0 else None)
+        for i, (port_name, lms_path) in enumerate(pending)
+    ]
+
+    if workers > 1 and len(jobs) > 1:
+        # Une session MODE indépendante par processus
+        print(f"  → {len(jobs)} entrées préparées en parallèle ({workers} processus)")
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            futures = {executor.submit(_prepare_input_lms_worker, *job): job[0] for job in jobs}
+            for future in as_completed(futures):
+                port_name = futures[future]
+                try:
+                    lms_path = future.result()
+                except Exception as e:
+                    print(f"  ✗ Erreur worker {port_name}: {e}")
+                    continue
+                if lms_path:
+                    lms_paths[port_name] = lms_path
+    else:
+        for job in jobs:
+            try:
+                lms_path = prepare_input_lms(*job)
+            except KeyboardInterrupt:
+                print(f"  ⚠ Interruption utilisateur")
+                break
+            if lms_path:
+                lms_paths[job[0]] = lms_path
+
+    # Seuls les fichiers régénérés sont relancés; les autres ont déjà leurs résultats
+    if run_batch:
+        run_lms_batch([lms_paths[job[0]] for job in jobs if job[0] in lms_paths])
+
+    return lms_paths
+
+
+def main():
+    # --- 2. PRÉPARATION DU GDS ---
+    print("="*70)
+    print("CONFIGURATION VARFDTD - STAR COUPLER")
+    print("="*70)
+
+    print("\n[ÉTAPE 1] Génération du composant...")
+    activate_ubcpdk()
+
+    # Create the star coupler (now includes input/output waveguides)
+    c = star_coupler(n_inputs=5, n_outputs=4)
+
+    run_varfdtd(c)
+
+    print("\n" + "="*70)
+    print("Configuration terminée pour toutes les entrées. Aucun run lancé.")
+    print("="*70)
+
 
-print("\n" + "="*70)
-print("Configuration terminée pour toutes les entrées. Aucun run lancé.")
-print("="*70)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
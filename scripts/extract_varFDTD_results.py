@@ -12,6 +12,8 @@ Utilisation:
 
 import sys
 import os
+import io
+import hashlib
 import numpy as np
 import glob
 
@@ -20,12 +22,11 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-# --- Configuration API Lumerical ---
-lumerical_api_path = r"C:\Program Files\Lumerical\v252\api\python" 
-if lumerical_api_path not in sys.path:
-    sys.path.append(lumerical_api_path)
+# Chemins Lumerical: voir scripts/lumerical_session.py
+from lumerical_session import get_mode
 
-import lumapi
+# Nombre de sorties du star coupler simulé (voir Run_varFDTD.py)
+N_OUTPUTS = 4
 
 print("="*70)
 print("EXTRACTION DES RÉSULTATS VARFDTD")
@@ -43,9 +44,11 @@ print(f"\n[1] Fichiers .lms trouvés: {len(lms_files)}")
 for lms_file in lms_files:
     print(f"    • {os.path.basename(lms_file)}")
 
-print(f"\n[1] Fichiers .lms trouvés: {len(lms_files)}")
-for lms_file in lms_files:
-    print(f"    • {os.path.basename(lms_file)}")
+# Liste des moniteurs calculée une seule fois pour tous les fichiers.
+# Les noms suivent ceux créés par Run_varFDTD.py (monitor_<port de sortie>).
+output_ports = [f"out{i}" for i in range(1, N_OUTPUTS + 1)]
+monitors = [f"monitor_{out_name}" for out_name in output_ports] + ["global_profile", "index_map"]
+print(f"    ✓ Moniteurs: {monitors}")
 
 # Prepare results directory
 results_dir = os.path.join(project_root, "simulations")
@@ -63,17 +66,13 @@ for lms_path in lms_files:
     print(f"TRAITEMENT: {lms_filename} (source: {source_name})")
     print("="*70)
 
-    # Ouvrir Lumerical et charger le fichier
+    # Charger le fichier dans la session MODE partagée (ouverte une seule fois)
     try:
-        mode = lumapi.MODE(hide=True)  # Hide GUI for faster processing
+        mode = get_mode()  # GUI hidden unless LUM_GUI=1
         mode.load(lms_path)
         print(f"  ✓ Fichier chargé")
     except Exception as e:
         print(f"  ✗ Erreur chargement: {e}")
-        try:
-            mode.close()
-        except:
-            pass
         continue
 
     # --- Extraction des résultats ---
@@ -82,46 +81,54 @@ for lms_path in lms_files:
     results = {}
     monitor_data = {}
     
-    # Get list of monitors
-    # For MODE, use known monitor names directly
-    monitors = ["monitor_e1", "monitor_e2", "monitor_e3", "monitor_e4", "global_profile", "index_map"]
-    print(f"    ✓ Utilisation des moniteurs standards: {monitors}")
-    
     # Extract data for each monitor
     print(f"\n  [3] Récupération des données de transmission...")
-    for monitor_name in monitors:
-        try:
-            print(f"    • Extraction {monitor_name}...")
-            
-            # For varFDTD in MODE, try direct data access
-            mode.eval(f'select("{monitor_name}");')
-            
-            # Get power data (for DFT monitors)
+
+    # Un seul aller-retour API: toutes les données rassemblées dans une struct
+    # Lumerical puis transférées en une fois avec getv
+    raw_data = {}
+    batch_script = "monitor_results = struct;\n" + "".join(
+        f'monitor_results.{monitor_name}_power = getdata("{monitor_name}", "power");\n'
+        f'monitor_results.{monitor_name}_f = getdata("{monitor_name}", "f");\n'
+        for monitor_name in monitors
+    )
+    try:
+        mode.eval(batch_script)
+        batch = mode.getv("monitor_results")
+        for monitor_name in monitors:
+            raw_data[monitor_name] = (batch[f"{monitor_name}_power"], batch[f"{monitor_name}_f"])
+    except Exception as e:
+        # Repli moniteur par moniteur (un moniteur absent fait échouer le lot)
+        print(f"    ⚠ Extraction groupée impossible ({e}), extraction par moniteur...")
+        for monitor_name in monitors:
             try:
-                power_values = mode.getdata(monitor_name, "power")
-                f_values = mode.getdata(monitor_name, "f")
-                
-                if power_values is not None and len(power_values) > 0:
-                    power_mean = float(np.mean(np.abs(power_values)))
-                    monitor_data[monitor_name] = power_mean
-                    
-                    # Convert frequency to wavelength
-                    c = 299792458  # m/s
-                    wavelengths = c / np.array(f_values) * 1e6  # convert to µm
-                    
-                    print(f"      ✓ P_mean = {power_mean:.6e} W (sur {len(power_values)} λ)")
-                    
-                    # Store arrays
-                    results[f"{monitor_name}_power"] = np.array(power_values).flatten()
-                    results[f"{monitor_name}_lambda"] = wavelengths.flatten()
-                    results[f"{monitor_name}_f"] = np.array(f_values).flatten()
-                else:
-                    print(f"      ⚠ Données vides ou nulles")
+                raw_data[monitor_name] = (
+                    mode.getdata(monitor_name, "power"),
+                    mode.getdata(monitor_name, "f"),
+                )
             except Exception as e:
-                print(f"      ⚠ Erreur getdata: {e}")
-            
-        except Exception as e:
-            print(f"    ⚠ {monitor_name}: {e}")
+                print(f"      ⚠ Erreur getdata {monitor_name}: {e}")
+
+    for monitor_name, (power_values, f_values) in raw_data.items():
+        print(f"    • Extraction {monitor_name}...")
+        if power_values is not None and len(power_values) > 0:
+            power_mean = float(np.mean(np.abs(power_values)))
+            monitor_data[monitor_name] = power_mean
+
+            # Convert frequency to wavelength
+            c = 299792458  # m/s
+            wavelengths = c / np.array(f_values) * 1e6  # convert to µm
+
+            print(f"      ✓ P_mean = {power_mean:.6e} W (sur {len(power_values)} λ)")
+
+            # Store arrays (puissance en simple précision: largement suffisant pour
+            # les transmissions, divise par deux la taille des .npz; fréquences et
+            # longueurs d'onde restent en double pour l'appariement exact)
+            results[f"{monitor_name}_power"] = np.asarray(power_values, dtype=np.float32).ravel()
+            results[f"{monitor_name}_lambda"] = wavelengths.flatten()
+            results[f"{monitor_name}_f"] = np.array(f_values).flatten()
+        else:
+            print(f"      ⚠ Données vides ou nulles")
     
     # Calculate transmissions
     if monitor_data:
@@ -146,11 +153,30 @@ for lms_path in lms_files:
         results["total_power"] = total_power
         results["source_name"] = source_name
     
-    # Save results for this source
+    # Save results for this source (sérialisé en mémoire; fichier réécrit
+    # atomiquement seulement si le contenu change, pour garder son mtime)
     try:
         results_file = os.path.join(results_dir, f"varFDTD_results_{source_name}.npz")
-        np.savez(results_file, **results)
-        print(f"\n    ✓ Résultats numpy: {results_file}")
+        buf = io.BytesIO()
+        np.savez(buf, **results)
+        data = buf.getvalue()
+        new_hash = hashlib.blake2b(data).hexdigest()
+        hash_file = results_file + ".hash"
+        try:
+            with open(hash_file, 'r', encoding='utf-8') as f:
+                old_hash = f.read().strip()
+        except OSError:
+            old_hash = None
+        if old_hash == new_hash and os.path.exists(results_file):
+            print(f"\n    ✓ Résultats numpy inchangés: {results_file}")
+        else:
+            tmp_file = results_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, results_file)
+            with open(hash_file, 'w', encoding='utf-8') as f:
+                f.write(new_hash)
+            print(f"\n    ✓ Résultats numpy: {results_file}")
     except Exception as e:
         print(f"    ✗ Erreur sauvegarde numpy: {e}")
     
@@ -184,12 +210,6 @@ for lms_path in lms_files:
     
     # Store in global results
     all_results[source_name] = results
-    
-    # Close MODE
-    try:
-        mode.close()
-    except:
-        pass
 
 print("\n" + "="*70)
 print("✓ EXTRACTION TERMINÉE")
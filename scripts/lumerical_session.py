@@ -0,0 +1,92 @@
+"""
+Sessions Lumerical partagées
+
+Une seule session MODE et une seule session FDTD par processus Python,
+ouvertes à la première demande puis réutilisées par tous les scripts
+(Run_varFDTD.py, extract_varFDTD_results.py, ...). Elles sont fermées
+automatiquement à la sortie de l'interpréteur.
+
+Les chemins de l'installation Lumerical sont définis ici (à adapter selon
+la version installée) et ajoutés à sys.path une seule fois par
+ensure_lumerical_path().
+"""
+
+import atexit
+import functools
+import os
+import sys
+
+# --- Configuration de l'installation Lumerical ---
+LUMERICAL_API_PATH = r"C:\Program Files\Lumerical\v252\api\python"
+LUMERICAL_PYTHON_PATH = r"C:\Program Files\Lumerical\v252\python"
+LUMERICAL_SITE_PACKAGES_PATH = r"C:\Program Files\Lumerical\v252\python\Lib\site-packages"
+
+# Interface graphique masquée par défaut (plus rapide); LUM_GUI=1 l'affiche
+HIDE_GUI = os.environ.get("LUM_GUI", "0") != "1"
+
+# Sessions ouvertes par ce module (fermées par close_sessions / atexit)
+_open_sessions = []
+
+# Chemins déjà ajoutés à sys.path (évite de re-parcourir sys.path à chaque appel)
+_configured_paths = set()
+
+
+def ensure_lumerical_path(with_python=False):
+    """Add the Lumerical API (and optionally its bundled Python) to sys.path once.
+
+    with_python also adds Lumerical's own python and site-packages folders,
+    needed by gplugins.lumerical.
+    """
+    paths = [LUMERICAL_API_PATH]
+    if with_python:
+        paths += [LUMERICAL_PYTHON_PATH, LUMERICAL_SITE_PACKAGES_PATH]
+    missing = [p for p in paths if p not in _configured_paths]
+    if not missing:
+        return
+    current = set(sys.path)
+    sys.path.extend(p for p in missing if p not in current)
+    _configured_paths.update(missing)
+
+
+def get_lumapi():
+    """Import lumapi on first use.
+
+    Loading the Lumerical API is slow; runs that never open a session (for
+    example when every LMS file is served from cache) skip it entirely.
+    """
+    ensure_lumerical_path()
+    import lumapi
+    return lumapi
+
+
+@functools.lru_cache(maxsize=None)
+def get_mode():
+    """Return the shared MODE session, opening it on first call (GUI per HIDE_GUI)."""
+    session = get_lumapi().MODE(hide=HIDE_GUI)
+    _open_sessions.append(session)
+    return session
+
+
+@functools.lru_cache(maxsize=None)
+def get_fdtd():
+    """Return the shared FDTD session, opening it on first call (GUI per HIDE_GUI)."""
+    session = get_lumapi().FDTD(hide=HIDE_GUI)
+    _open_sessions.append(session)
+    return session
+
+
+@atexit.register
+def close_sessions():
+    """Close every shared session now (also called at interpreter exit).
+
+    Worker processes must call it themselves: multiprocessing children exit
+    without running atexit handlers.
+    """
+    get_mode.cache_clear()
+    get_fdtd.cache_clear()
+    while _open_sessions:
+        session = _open_sessions.pop()
+        try:
+            session.close()
+        except Exception:
+            pass
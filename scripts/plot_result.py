@@ -64,6 +64,11 @@ def load_all_sources(path: Path):
     return sources_data
 
 
+def _wrap_phase_deg(phase_deg):
+    """Wrap phase(s) in degrees to (-180, 180] (works on scalars and arrays)."""
+    return np.degrees(np.angle(np.exp(1j * np.radians(phase_deg))))
+
+
 def filter_to_closest_wavelength(data, target_wavelength=1.55):
     """Filter data to only the wavelength closest to target_wavelength."""
     filtered_data = defaultdict(lambda: {"wavelength": [], "transmission": [], "phase_rad": [], "phase_deg": []})
@@ -73,8 +78,7 @@ def filter_to_closest_wavelength(data, target_wavelength=1.55):
             continue
         
         # Find index of closest wavelength to target
-        closest_idx = min(range(len(series["wavelength"])), 
-                         key=lambda i: abs(series["wavelength"][i] - target_wavelength))
+        closest_idx = int(np.argmin(np.abs(np.asarray(series["wavelength"]) - target_wavelength)))
         
         filtered_data[monitor]["wavelength"].append(series["wavelength"][closest_idx])
         filtered_data[monitor]["transmission"].append(series["transmission"][closest_idx])
@@ -161,14 +165,13 @@ def plot_phase_shift(data, ref="freq_monitor_out1", target="freq_monitor_out2"):
         print(f"Skipping phase shift: missing data for {ref} or {target}.")
         return
 
-    ref_map = {wl: ph for wl, ph in zip(data[ref]["wavelength"], data[ref]["phase_deg"])}
-    tgt_map = {wl: ph for wl, ph in zip(data[target]["wavelength"], data[target]["phase_deg"])}
-    common_wl = sorted(set(ref_map) & set(tgt_map))
-    if not common_wl:
+    common_wl, tgt_idx, ref_idx = np.intersect1d(
+        data[target]["wavelength"], data[ref]["wavelength"], return_indices=True)
+    if not common_wl.size:
         print("No common wavelengths to compute phase shift.")
         return
 
-    shift = [tgt_map[wl] - ref_map[wl] for wl in common_wl]
+    shift = np.asarray(data[target]["phase_deg"])[tgt_idx] - np.asarray(data[ref]["phase_deg"])[ref_idx]
 
     plt.figure(figsize=(8, 4))
     plt.plot(common_wl, shift, marker="o")
@@ -276,26 +279,13 @@ def plot_phase_vs_wavelength_all_sources(sources_data, max_sources=5):
             if not ref_wavelengths or not target_wavelengths:
                 continue
             
-            # Calculate phase shift relative to out1
-            phase_shifts = []
-            common_wavelengths = []
-            
-            for wl, ph in zip(target_wavelengths, target_phases):
-                # Find corresponding reference phase at this wavelength
-                if wl in ref_wavelengths:
-                    ref_idx = ref_wavelengths.index(wl)
-                    phase_shift = ph - ref_phases[ref_idx]
-                    
-                    # Normalize to [-180, 180]
-                    while phase_shift > 180:
-                        phase_shift -= 360
-                    while phase_shift < -180:
-                        phase_shift += 360
-                    
-                    phase_shifts.append(phase_shift)
-                    common_wavelengths.append(wl)
+            # Calculate phase shift relative to out1 on the common wavelengths
+            common_wavelengths, tgt_idx, ref_idx = np.intersect1d(
+                target_wavelengths, ref_wavelengths, return_indices=True)
+            phase_shifts = _wrap_phase_deg(
+                np.asarray(target_phases)[tgt_idx] - np.asarray(ref_phases)[ref_idx])
             
-            if common_wavelengths:
+            if common_wavelengths.size:
                 ax.plot(common_wavelengths, phase_shifts,
                        color=colors[source_idx % len(colors)], linewidth=2,
                        marker='o', markersize=4, 
@@ -625,23 +615,17 @@ def plot_phase_error_all_sources(sources_data, max_sources=5):
         # Extract input number from source name (e.g., "i1", "i2")
         desired_phase_shift = desired_source_phases.get(source_name, 0)
         
+        # Gather all monitors first, then compute every error in one array operation
+        plotted = [(monitor, color) for monitor, color in zip(monitors, colors)
+                   if data[monitor].get("transmission") and data[monitor].get("phase_deg")]
+        magnitudes = np.array([data[monitor]["transmission"][0] for monitor, _ in plotted])
+        phases_deg = np.array([data[monitor]["phase_deg"][0] for monitor, _ in plotted])
+        
+        # Error = simulated (relative to reference) - desired, normalized to [-180, 180]
+        phase_errors_deg = _wrap_phase_deg(phases_deg - ref_phase_deg - desired_phase_shift)
+        
         # Plot each monitor as a phasor with error calculation
-        for monitor, color in zip(monitors, colors):
-            try:
-                magnitude = data[monitor]["transmission"][0]
-                phase_sim_deg = data[monitor]["phase_deg"][0] - ref_phase_deg
-            except (KeyError, IndexError):
-                continue
-            
-            # Error = simulated - desired
-            phase_error_deg = phase_sim_deg - desired_phase_shift
-            
-            # Normalize error to [-180, 180]
-            while phase_error_deg > 180:
-                phase_error_deg -= 360
-            while phase_error_deg < -180:
-                phase_error_deg += 360
-            
+        for (monitor, color), magnitude, phase_error_deg in zip(plotted, magnitudes, phase_errors_deg):
             phase_rad = np.radians(phase_error_deg)
             ax.arrow(phase_rad, 0, 0, magnitude, head_width=0.1, head_length=0.01,
                      fc=color, ec=color, linewidth=2.5, label=_display_monitor_name(monitor))